@@ -0,0 +1,129 @@
+# ============================================================================================
+# Script: Throughput of the async WikiClient vs the old sequential loop (offline stub)
+# --------------------------------------------------------------------------------------------
+# Starts stub_wiki_server.py locally with a fixed per-request latency, generates synthetic
+# lines of entities (a Zipf-like vocabulary, so entities repeat across lines as they do in
+# the TabFact files) and runs:
+#   1) the old predict-wiki.py pattern: one blocking title lookup per entity, one topic POST
+#      per line, everything sequential (the old time.sleep(0.1) per line is reported, not run),
+#   2) WikiClient: batched title lookups + concurrent topic POSTs,
+#   3) WikiClient again with a fraction of 503 responses, to check retries give the same rows.
+# Best titles and top-3 topics must be identical across the three runs.
+# --concurrency / --rate default to WikiClient's own defaults (the settings predict-wiki.py
+# uses against Wikimedia); raise them to see what the client does against the local stub.
+#   python bench_wiki_client.py --lines 100 --latency 0.05
+# Requires aiohttp (used by wiki_client.py):  pip install aiohttp
+# ============================================================================================
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from stub_wiki_server import start_stub
+from wiki_client import WikiClient, DEFAULT_MAX_CONCURRENCY, DEFAULT_RATE_PER_HOST
+
+USER_AGENT = "TopicPredictorBot/1.0 (bench)"
+OLD_SLEEP_PER_LINE = 0.1
+
+def synthetic_lines(n_lines, vocab_size=2000, per_line=(5, 20), seed=0):
+    rng = random.Random(seed)
+    vocab = [f"entity {i}" if i % 5 else f"{i}th" for i in range(vocab_size)]
+    weights = [1.0 / (i + 1) for i in range(vocab_size)]
+    return [list(dict.fromkeys(rng.choices(vocab, weights, k=rng.randint(*per_line)))) for _ in range(n_lines)]
+
+def best_titles(entities_per_line, resolved):
+    return [next((resolved[e] for e in ents if resolved.get(e)), "") for ents in entities_per_line]
+
+# --- 1) old pattern, sequential ---
+def sequential(server, entities_per_line):
+    def get_json(url, data=None):
+        headers = {"User-Agent": USER_AGENT, "Content-Type": "application/json"}
+        req = urllib.request.Request(url, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=10) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError:
+            return None
+
+    rows = []
+    for ents in entities_per_line:
+        titles = []
+        for ent in ents:
+            params = {"action": "query", "prop": "info", "redirects": "1", "format": "json",
+                      "formatversion": "2", "titles": ent}
+            query = get_json(server.wiki_api + "?" + urllib.parse.urlencode(params))["query"]
+            target = {n["from"]: n["to"] for n in query["normalized"]}.get(ent, ent)
+            target = {r["from"]: r["to"] for r in query["redirects"]}.get(target, target)
+            if any(p["title"] == target and not p.get("missing") for p in query["pages"]):
+                titles.append(target)
+        best = titles[0] if titles else ""
+        predictions = []
+        if best:
+            payload = json.dumps({"page_title": best.replace(" ", "_"), "lang": "en", "threshold": 0.0})
+            data = get_json(server.topic_api, payload.encode("utf-8"))
+            if data:
+                predictions = sorted(data["prediction"]["results"], key=lambda x: x["score"], reverse=True)[:3]
+        rows.append((best, predictions))
+    return rows
+
+# --- 2) / 3) async client ---
+async def concurrent(server, entities_per_line, concurrency, rate):
+    async with WikiClient(USER_AGENT, wiki_api=server.wiki_api, topic_api=server.topic_api,
+                          max_concurrency=concurrency, rate_per_host=rate, backoff=0.05) as client:
+        resolved = await client.resolve_titles([e for ents in entities_per_line for e in ents], desc="titles")
+        best = best_titles(entities_per_line, resolved)
+        topics = await client.predict_topics_many([b for b in best if b], desc="topics")
+        rows = [(b, topics.get(b, []) if b else []) for b in best]
+    return rows, client.requests, client.retries
+
+def run(label, fn, n_lines, server):
+    t0 = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - t0
+    print(f"{label:<34}{seconds:>9.2f}s{n_lines / seconds:>10.1f} lines/s   stub requests {server.counts}")
+    return out, seconds
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_HOST, help="requests/s per host")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    lines = synthetic_lines(args.lines)
+    n_entities = sum(len(e) for e in lines)
+    n_distinct = len({e for ents in lines for e in ents})
+    print(f"🧪 {args.lines} lines, {n_entities} entities ({n_distinct} distinct), stub latency {args.latency * 1000:.0f} ms")
+
+    server = start_stub(latency=args.latency)
+    seq_rows, t_seq = run("sequential (old loop, no sleep)", lambda: sequential(server, lines), args.lines, server)
+    server.shutdown()
+
+    server = start_stub(latency=args.latency)
+    (async_rows, n_req, _), t_async = run(f"WikiClient (x{args.concurrency}, {args.rate:g}/s/host)",
+                                          lambda: asyncio.run(concurrent(server, lines, args.concurrency, args.rate)),
+                                          args.lines, server)
+    peak = server.peak_in_flight
+    server.shutdown()
+
+    server = start_stub(latency=args.latency, error_rate=args.error_rate, seed=1)
+    (retry_rows, _, n_retries), _ = run(f"WikiClient, {args.error_rate:.0%} HTTP 503",
+                                        lambda: asyncio.run(concurrent(server, lines, args.concurrency, args.rate)),
+                                        args.lines, server)
+    server.shutdown()
+
+    t_old = t_seq + OLD_SLEEP_PER_LINE * args.lines
+    print(f"\n⏱️ {t_seq / t_async:.1f}x faster than the sequential loop "
+          f"({t_old / t_async:.1f}x counting its {OLD_SLEEP_PER_LINE}s/line sleep); "
+          f"{n_req} requests, peak {peak} in flight; {n_retries} retries in the 503 run")
+    print(f"✅ Rows identical: async = sequential {async_rows == seq_rows}, with retries = sequential {retry_rows == seq_rows}")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,16 @@
 import os
+import sys
 import json
 import re
 from collections import defaultdict
 
+# Shared utilities live in TableInstruct/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from seg_cleaner import clean_tabfact_seg
+
 def clean_input_seg(text):
-    # Extract content after "The table caption is about"
-    marker = "The table caption is about"
-    if marker in text:
-        text = text.split(marker, 1)[1]
-
-    # Remove [TAB], [SEP], and |
-    text = re.sub(r'\[TAB\]|\[SEP\]|\|', '', text)
-    return text.strip()
+    # Content after "The table caption is about", without [TAB], [SEP] and |
+    return clean_tabfact_seg(text)
 
 def extract_table_key(text):
     # Extract everything after [TLE] and before the first [TAB]
@@ -1,14 +1,29 @@
 import os
-import spacy
+import sys
 import pandas as pd
 from tqdm import tqdm
-from transformers import pipeline
-import time
+
+# Shared utilities live in TableInstruct/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import model_registry  # models load on first use, once per process
+from classification_cache import DEFAULT_PATH as SHARED_CLASSIFICATION_CACHE
+from entity_extraction import extract_entities_batch  # NER-only spaCy, nlp.pipe batches
 
 # Configuration
 INPUT_FOLDER = 'test'
 OUTPUT_FOLDER = 'topic prediction bart'
 USER_AGENT = "TopicPredictorBot/1.0"
+BATCH_SIZE = 32  # (text, label) pairs per BART forward pass
+SPACY_BATCH_SIZE = 256  # texts per nlp.pipe batch
+SPACY_N_PROCESS = 1     # >1 runs spaCy in that many worker processes
+SPACY_MODEL = "en_core_web_sm"
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+CLASSIFICATION_CACHE = SHARED_CLASSIFICATION_CACHE  # SQLite score cache shared by all scripts; None disables
+ZERO_SHOT_BACKEND = 'bart'  # 'bart' (BART-large-MNLI pipeline) or 'bi-encoder' (faster approximation, bi_encoder_zero_shot.py)
+BI_ENCODER_MODEL = "all-MiniLM-L6-v2"
+BI_ENCODER_CALIBRATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Question Answering',
+                                      'sample100domain', 'bi_encoder_calibration.json')  # written by eval_bi_encoder_zero_shot.py; None = raw cosines
+TIMING_LOG = os.path.join(OUTPUT_FOLDER, 'timings.log')  # one JSON line per run
 
 # Labels for classification
 LABELS = [
@@ -28,62 +43,82 @@ LABELS = [
     "Healthcare and Medicine"
 ]
 
-# Setup
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-nlp = spacy.load("en_core_web_sm")
-
-# Initialize zero-shot classifier
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-
 # --- Helper Functions ---
 
-def extract_entities(text):
-    doc = nlp(text)
-    return list(set(ent.text for ent in doc.ents if len(ent.text) > 2))
-
-def predict_topics_with_zero_shot(text, labels):
-    result = classifier(text, labels, multi_label=True)
-    # Sort results by score descending
-    sorted_results = sorted(zip(result['labels'], result['scores']), key=lambda x: x[1], reverse=True)
-    return sorted_results[:3]
+def extract_entities(texts):
+    return extract_entities_batch(texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS,
+                                  nlp=model_registry.ner(SPACY_MODEL))
+
+def zero_shot_classifier():
+    # BART pipeline or its bi-encoder approximation, per ZERO_SHOT_BACKEND (cached under separate model keys)
+    if ZERO_SHOT_BACKEND == 'bi-encoder':
+        return model_registry.bi_encoder_zero_shot(BI_ENCODER_MODEL, cache_path=CLASSIFICATION_CACHE,
+                                                   calibration_path=BI_ENCODER_CALIBRATION)
+    if ZERO_SHOT_BACKEND == 'bart':
+        return model_registry.zero_shot(ZERO_SHOT_MODEL, batch_size=BATCH_SIZE, cache_path=CLASSIFICATION_CACHE)
+    raise ValueError(f"Unknown ZERO_SHOT_BACKEND {ZERO_SHOT_BACKEND!r} (expected 'bart' or 'bi-encoder')")
+
+def predict_topics_with_zero_shot(texts, labels):
+    # Top 3 per text, sorted by score descending
+    classifier = zero_shot_classifier()
+    return classifier.classify(texts, labels, multi_label=True, top_k=3)
+
+def input_files():
+    if not os.path.isdir(INPUT_FOLDER):
+        return []
+    return sorted(f for f in os.listdir(INPUT_FOLDER) if f.endswith(".txt"))
 
 # --- Main Processing Loop ---
 
-for filename in os.listdir(INPUT_FOLDER):
-    if not filename.endswith(".txt"):
-        continue
-
-    input_path = os.path.join(INPUT_FOLDER, filename)
-    output_path = os.path.join(OUTPUT_FOLDER, filename.replace('.txt', '.csv'))
-
-    rows = []
-
-    with open(input_path, 'r', encoding='utf-8') as file:
-        lines = [line.strip() for line in file if line.strip()]
-
-    for line in tqdm(lines, desc=f"Processing {filename}", unit="line"):
-        entities = extract_entities(line)
-
-        # Use the full line as the classification input
-        predictions = predict_topics_with_zero_shot(line, LABELS)
-
-        top1_topic, top1_score = predictions[0][0], round(predictions[0][1], 4)
-        top2_topic, top2_score = predictions[1][0], round(predictions[1][1], 4)
-        top3_topic, top3_score = predictions[2][0], round(predictions[2][1], 4)
-
-        rows.append({
-            "Top 1 Topic": top1_topic,
-            "Top 1 Score": top1_score,
-            "Top 2 Topic": top2_topic,
-            "Top 2 Score": top2_score,
-            "Top 3 Topic": top3_topic,
-            "Top 3 Score": top3_score,
-            "Entities": ", ".join(entities),
-            "Original text": line
-        })
-
-        time.sleep(0.1)  # optional polite delay
-
-    df = pd.DataFrame(rows)
-    df.to_csv(output_path, index=False)
-    print(f"\n✅ Saved: {output_path}")
+def main():
+    filenames = input_files()
+    if not filenames:
+        print(f"ℹ️ No .txt files in {INPUT_FOLDER} — nothing to do.")
+        model_registry.log_timings(TIMING_LOG, "predict-bart", files=0, rows=0)
+        return
+
+    # Setup
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    n_rows = 0
+
+    for filename in filenames:
+        input_path = os.path.join(INPUT_FOLDER, filename)
+        output_path = os.path.join(OUTPUT_FOLDER, filename.replace('.txt', '.csv'))
+
+        rows = []
+
+        with open(input_path, 'r', encoding='utf-8') as file:
+            lines = [line.strip() for line in file if line.strip()]
+
+        # Use the full line as the classification input; all lines of the file in one batched pass
+        all_predictions = predict_topics_with_zero_shot(lines, LABELS)
+        all_entities = extract_entities(lines)
+
+        for line, predictions, entities in tqdm(zip(lines, all_predictions, all_entities), total=len(lines),
+                                                desc=f"Processing {filename}", unit="line"):
+            top1_topic, top1_score = predictions[0][0], round(predictions[0][1], 4)
+            top2_topic, top2_score = predictions[1][0], round(predictions[1][1], 4)
+            top3_topic, top3_score = predictions[2][0], round(predictions[2][1], 4)
+
+            rows.append({
+                "Top 1 Topic": top1_topic,
+                "Top 1 Score": top1_score,
+                "Top 2 Topic": top2_topic,
+                "Top 2 Score": top2_score,
+                "Top 3 Topic": top3_topic,
+                "Top 3 Score": top3_score,
+                "Entities": ", ".join(entities),
+                "Original text": line
+            })
+
+        df = pd.DataFrame(rows)
+        df.to_csv(output_path, index=False)
+        print(f"\n✅ Saved: {output_path}")
+        n_rows += len(rows)
+
+    if CLASSIFICATION_CACHE:
+        zero_shot_classifier().cache.report()
+    model_registry.log_timings(TIMING_LOG, "predict-bart", files=len(filenames), rows=n_rows)
+
+if __name__ == "__main__":
+    main()
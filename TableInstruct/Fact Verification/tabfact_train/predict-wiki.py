@@ -1,112 +1,67 @@
 import os
-import requests
-import spacy
+import sys
+import asyncio
 import pandas as pd
-from wikipediaapi import Wikipedia
-from tqdm import tqdm
-import time
 
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+# Shared utilities live in TableInstruct/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import model_registry  # models load on first use, once per process
+from entity_extraction import extract_entities_batch  # NER-only spaCy, nlp.pipe batches
+from wiki_client import WikiClient, WIKIPEDIA_API, TOPIC_API  # asyncio: batched titles, concurrent topics (needs: pip install aiohttp)
 
 # Configuration
 INPUT_FOLDER = 'test'
 OUTPUT_FOLDER = 'topic prediction'
 USER_AGENT = "TopicPredictorBot/1.0"
 THRESHOLD = 0.0  # Keep 0 to always get top 3 results
-
-# Setup
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-nlp = spacy.load("en_core_web_sm")
-wiki = Wikipedia(user_agent=USER_AGENT, language='en')
-
-# Setup requests session with retries and timeout
-session = requests.Session()
-retries = Retry(total=5, backoff_factor=1, status_forcelist=[502, 503, 504])
-adapter = HTTPAdapter(max_retries=retries)
-session.mount('http://', adapter)
-session.mount('https://', adapter)
+SPACY_BATCH_SIZE = 256  # texts per nlp.pipe batch
+SPACY_N_PROCESS = 1     # >1 runs spaCy in that many worker processes
+SPACY_MODEL = "en_core_web_sm"
+TIMING_LOG = os.path.join(OUTPUT_FOLDER, 'timings.log')  # one JSON line per run
+
+# HTTP client (point both URLs at stub_wiki_server.py to run offline)
+WIKI_API_URL = WIKIPEDIA_API
+TOPIC_API_URL = TOPIC_API
+MAX_CONCURRENCY = 2     # requests in flight across both APIs (Wikimedia etiquette: keep it low)
+RATE_PER_HOST = 5.0     # requests/s to each host; raise only for the local stub
+MAX_RETRIES = 5         # per request, jittered exponential backoff
 
 # --- Helper Functions ---
 
-def extract_entities(text):
-    doc = nlp(text)
-    return list(set(ent.text for ent in doc.ents if len(ent.text) > 2))
-
-def get_wikipedia_titles(entities, max_retries=3, timeout=10):
-    titles = []
-    for ent in entities:
-        for attempt in range(max_retries):
-            try:
-                page = wiki.page(ent)
-                if page.exists():
-                    titles.append(page.title)
-                break  # Exit retry loop if successful
-            except requests.exceptions.ReadTimeout:
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    print(f"⚠️ Timeout fetching page for: {ent}")
-    return list(set(titles))
-
-def predict_topic_from_title(title, lang='en', threshold=THRESHOLD):
-    payload = {
-        "page_title": title.replace(" ", "_"),
-        "lang": lang,
-        "threshold": threshold
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": USER_AGENT
-    }
-
-    url = "https://api.wikimedia.org/service/lw/inference/v1/models/outlink-topic-model:predict"
-
-    try:
-        response = session.post(url, json=payload, headers=headers, timeout=10)
-        if response.status_code == 200:
-            result = response.json()
-            if "prediction" in result:
-                predictions = sorted(result['prediction']['results'], key=lambda x: x['score'], reverse=True)
-                return predictions[:3]
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Error predicting topic for title {title}: {e}")
-    return []
-
-# --- Main Processing Loop ---
+def extract_entities(texts):
+    return extract_entities_batch(texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS,
+                                  nlp=model_registry.ner(SPACY_MODEL))
 
-for filename in os.listdir(INPUT_FOLDER):
-    if not filename.endswith(".txt"):
-        continue
+def input_files():
+    if not os.path.isdir(INPUT_FOLDER):
+        return []
+    return sorted(f for f in os.listdir(INPUT_FOLDER) if f.endswith(".txt"))
 
-    input_path = os.path.join(INPUT_FOLDER, filename)
-    output_path = os.path.join(OUTPUT_FOLDER, filename.replace('.txt', '.csv'))
+async def predict_lines(client, lines, all_entities, desc):
+    """One output row per line: entities → existing Wikipedia titles → topics of the first title."""
+    resolved = await client.resolve_titles([e for ents in all_entities for e in ents], desc=f"{desc} titles")
+    # Titles in entity order, so the page title used is the first entity that has a page
+    all_titles = [list(dict.fromkeys(resolved[e] for e in ents if resolved.get(e))) for ents in all_entities]
+    best_titles = [titles[0] if titles else "" for titles in all_titles]
+    topics = await client.predict_topics_many([t for t in best_titles if t], THRESHOLD, desc=f"{desc} topics")
 
     rows = []
-
-    with open(input_path, 'r', encoding='utf-8') as file:
-        lines = [line.strip() for line in file if line.strip()]
-
-    for line in tqdm(lines, desc=f"Processing {filename}", unit="line"):
-        entities = extract_entities(line)
-        titles = get_wikipedia_titles(entities)
-        best_title = titles[0] if titles else ""
+    for line, entities, titles, best_title in zip(lines, all_entities, all_titles, best_titles):
+        predictions = topics.get(best_title, []) if best_title else []
 
         top1_topic, top1_score = "", ""
         top2_topic, top2_score = "", ""
         top3_topic, top3_score = "", ""
 
-        if best_title:
-            predictions = predict_topic_from_title(best_title)
-            if len(predictions) > 0:
-                top1_topic = predictions[0]['topic']
-                top1_score = round(predictions[0]['score'], 4)
-            if len(predictions) > 1:
-                top2_topic = predictions[1]['topic']
-                top2_score = round(predictions[1]['score'], 4)
-            if len(predictions) > 2:
-                top3_topic = predictions[2]['topic']
-                top3_score = round(predictions[2]['score'], 4)
+        if len(predictions) > 0:
+            top1_topic = predictions[0]['topic']
+            top1_score = round(predictions[0]['score'], 4)
+        if len(predictions) > 1:
+            top2_topic = predictions[1]['topic']
+            top2_score = round(predictions[1]['score'], 4)
+        if len(predictions) > 2:
+            top3_topic = predictions[2]['topic']
+            top3_score = round(predictions[2]['score'], 4)
 
         rows.append({
             "Top 1 Topic": top1_topic,
@@ -120,9 +75,44 @@ for filename in os.listdir(INPUT_FOLDER):
             "Using page title": best_title,
             "Original text": line
         })
+    return rows
 
-        time.sleep(0.1)  # polite API delay
+# --- Main Processing Loop ---
 
-    df = pd.DataFrame(rows)
-    df.to_csv(output_path, index=False)
-    print(f"\n✅ Saved: {output_path}")
+async def run(filenames):
+    n_rows = 0
+    # One client for the whole run: titles and topics resolved for one file are reused by the next
+    async with WikiClient(USER_AGENT, wiki_api=WIKI_API_URL, topic_api=TOPIC_API_URL,
+                          max_concurrency=MAX_CONCURRENCY, rate_per_host=RATE_PER_HOST,
+                          max_retries=MAX_RETRIES) as client:
+        for filename in filenames:
+            input_path = os.path.join(INPUT_FOLDER, filename)
+            output_path = os.path.join(OUTPUT_FOLDER, filename.replace('.txt', '.csv'))
+
+            with open(input_path, 'r', encoding='utf-8') as file:
+                lines = [line.strip() for line in file if line.strip()]
+
+            all_entities = extract_entities(lines)
+            rows = await predict_lines(client, lines, all_entities, desc=f"Processing {filename}:")
+
+            df = pd.DataFrame(rows)
+            df.to_csv(output_path, index=False)
+            print(f"\n✅ Saved: {output_path}")
+            n_rows += len(rows)
+        print(f"🌐 {client.requests} HTTP requests, {client.retries} retries")
+    return n_rows
+
+def main():
+    filenames = input_files()
+    if not filenames:
+        print(f"ℹ️ No .txt files in {INPUT_FOLDER} — nothing to do.")
+        model_registry.log_timings(TIMING_LOG, "predict-wiki", files=0, rows=0)
+        return
+
+    # Setup
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    n_rows = asyncio.run(run(filenames))
+    model_registry.log_timings(TIMING_LOG, "predict-wiki", files=len(filenames), rows=n_rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# ============================================================================================
+# Module: Local stub of the two HTTP APIs predict-wiki.py talks to (stdlib only)
+# --------------------------------------------------------------------------------------------
+# Emulates, deterministically and offline:
+#   GET  /w/api.php?action=query&prop=info&redirects=1&formatversion=2&titles=A|B|...
+#        → {"query": {"normalized": [...], "redirects": [...], "pages": [...]}}
+#          titles are normalized MediaWiki-style (first letter upper-cased, "_" → " "),
+#          about 2 in 3 titles exist, titles made of digits + "th" redirect to "Ordinal <n>"
+#   POST /service/lw/inference/v1/models/outlink-topic-model:predict
+#        {"page_title", "lang", "threshold"} → {"prediction": {"article", "results": [...]}}
+#          5 topics with scores derived from a hash of the title (missing page → 400)
+# Each response is delayed by `latency` seconds; a fraction `error_rate` of requests gets a
+# 503 (Retry-After: 0) to exercise client retries. Request counts and the peak number of
+# requests in flight are kept on the server object.
+#
+#   server = start_stub(latency=0.05); ...; server.shutdown()
+#   python stub_wiki_server.py --port 8000          (serve until Ctrl+C)
+# ============================================================================================
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+WIKI_PATH = "/w/api.php"
+TOPIC_PATH = "/service/lw/inference/v1/models/outlink-topic-model:predict"
+TOPICS = [
+    "Culture.Sports", "Culture.Media.Media*", "Geography.Regions.Europe.Europe*",
+    "Geography.Regions.Americas.North_America", "History_and_Society.History",
+    "History_and_Society.Politics_and_government", "STEM.STEM*", "Culture.Biography.Biography*",
+    "History_and_Society.Business_and_economics", "Geography.Regions.Asia.Asia*",
+]
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+def normalize(title):
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+def redirect_target(title):
+    number = title[:-2]
+    return f"Ordinal {number}" if title.endswith("th") and number.isdigit() else None
+
+def page_exists(title):
+    """Redirect pages and their "Ordinal <n>" targets exist, about 2 in 3 other titles do."""
+    return title.startswith("Ordinal ") or redirect_target(title) is not None or _hash(title) % 3 != 0
+
+def topic_scores(title):
+    h = _hash(title)
+    picks = [TOPICS[(h >> (4 * k)) % len(TOPICS)] for k in range(8)]
+    topics = list(dict.fromkeys(picks))[:5]
+    return [{"topic": t, "score": round(((h >> (8 * k)) % 997) / 997, 4)} for k, t in enumerate(topics)]
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=()):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, route):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            server.counts[route] = server.counts.get(route, 0) + 1
+            fail = server.rng.random() < server.error_rate
+        try:
+            time.sleep(server.latency)
+            if fail:
+                with server.lock:
+                    server.counts["503"] = server.counts.get("503", 0) + 1
+                self._send(503, {"error": "stub overload"}, [("Retry-After", "0")])
+            elif route == "wiki":
+                self._wiki()
+            else:
+                self._topic()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _wiki(self):
+        query = parse_qs(urlsplit(self.path).query)
+        titles = query.get("titles", [""])[0].split("|")
+        normalized, redirects, pages = [], [], []
+        for title in dict.fromkeys(titles):
+            norm = normalize(title)
+            if norm != title:
+                normalized.append({"fromencoded": False, "from": title, "to": norm})
+            target = redirect_target(norm)
+            if target and "redirects" in query:
+                redirects.append({"from": norm, "to": target})
+                norm = target
+            if page_exists(norm):
+                pages.append({"pageid": _hash(norm) % 10_000_000, "ns": 0, "title": norm})
+            else:
+                pages.append({"ns": 0, "title": norm, "missing": True})
+        self._send(200, {"batchcomplete": True,
+                         "query": {"normalized": normalized, "redirects": redirects, "pages": pages}})
+
+    def _topic(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        title = payload.get("page_title", "").replace("_", " ")
+        if not page_exists(title):
+            self._send(400, {"error": f"page {title} not found"})
+            return
+        threshold = float(payload.get("threshold", 0.0))
+        results = [r for r in topic_scores(title) if r["score"] >= threshold]
+        self._send(200, {"prediction": {"article": f"https://{payload.get('lang', 'en')}.wikipedia.org/wiki/"
+                                                   f"{payload.get('page_title', '')}", "results": results}})
+
+    def do_GET(self):
+        if urlsplit(self.path).path == WIKI_PATH:
+            self._handle("wiki")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path == TOPIC_PATH:
+            self._handle("topic")
+        else:
+            self._send(404, {"error": "not found"})
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency=0.05, error_rate=0.0, seed=0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def wiki_api(self):
+        return self.base_url + WIKI_PATH
+
+    @property
+    def topic_api(self):
+        return self.base_url + TOPIC_PATH
+
+def start_stub(port=0, latency=0.05, error_rate=0.0, seed=0):
+    """Starts a StubServer on 127.0.0.1 in a daemon thread (port 0 = any free port)."""
+    server = StubServer(("127.0.0.1", port), latency=latency, error_rate=error_rate, seed=seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline stub of the MediaWiki and outlink-topic APIs")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubServer(("127.0.0.1", args.port), latency=args.latency, error_rate=args.error_rate)
+    print(f"🧪 Stub APIs on {server.base_url}  (wiki: {server.wiki_api}, topics: {server.topic_api})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
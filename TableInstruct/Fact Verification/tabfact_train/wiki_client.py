@@ -0,0 +1,187 @@
+# ============================================================================================
+# Module: Async Wikipedia / Wikimedia client for predict-wiki.py
+# --------------------------------------------------------------------------------------------
+# predict-wiki.py used to resolve every entity with a blocking wiki.page(ent).exists() call,
+# POST each best title to the outlink-topic-model endpoint one after the other and sleep
+# 0.1 s per line. WikiClient (asyncio + aiohttp) instead:
+#   - resolves entities 50 titles per MediaWiki query (action=query&prop=info&redirects),
+#     following normalization ("year" → "Year") and redirects ("4th" → "Fourth") like
+#     wikipediaapi did, and remembers every entity / title it has already resolved,
+#   - runs at most max_concurrency requests at once (one semaphore for all hosts),
+#   - spaces requests to each host at least 1 / rate_per_host seconds apart,
+#   - remembers definitive answers, including failures: a non-retried status (e.g. 400/404)
+#     is cached as "no page" for the titles of that query and as "no topics" for a topic
+#     POST, so neither is requested again; only requests that ran out of retries are tried
+#     again on a later call,
+#   - retries timeouts, connection errors, 429 and 5xx responses up to max_retries times
+#     with full-jitter exponential backoff (uniform(0, backoff * 2**attempt), capped), and
+#     waits at least Retry-After when the server sends one.
+#
+# The defaults (2 requests in flight, 5 requests/s per host) follow the Wikimedia API
+# etiquette of mostly serial requests from anonymous clients; most of the speedup comes from
+# batching and caching, not from concurrency. Raise them only for the local stub or with an
+# agreed higher limit.
+#
+# Both endpoints are constructor arguments, so the client runs offline against
+# stub_wiki_server.py (see bench_wiki_client.py).
+# Requires aiohttp (third-party, not used elsewhere in the repo):  pip install aiohttp
+# ============================================================================================
+
+import asyncio
+import random
+from urllib.parse import urlsplit
+
+import aiohttp
+from tqdm import tqdm
+
+WIKIPEDIA_API = "https://{lang}.wikipedia.org/w/api.php"
+TOPIC_API = "https://api.wikimedia.org/service/lw/inference/v1/models/outlink-topic-model:predict"
+TITLES_PER_QUERY = 50          # MediaWiki limit for titles= without apihighlimits
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 30.0
+DEFAULT_MAX_CONCURRENCY = 2    # requests in flight (Wikimedia etiquette, see above)
+DEFAULT_RATE_PER_HOST = 5.0    # requests/s per host
+GAVE_UP = object()             # _request_json result once retries are exhausted (not cached)
+
+class HostRateLimiter:
+    """Hands out request slots at least 1 / rate seconds apart (rate <= 0 → unlimited)."""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class WikiClient:
+    def __init__(self, user_agent, lang="en", wiki_api=WIKIPEDIA_API, topic_api=TOPIC_API,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_per_host=DEFAULT_RATE_PER_HOST, max_retries=5, backoff=0.5, timeout=10):
+        self.user_agent = user_agent
+        self.lang = lang
+        self.wiki_api = wiki_api.format(lang=lang)
+        self.topic_api = topic_api
+        self.max_concurrency = max_concurrency
+        self.rate_per_host = rate_per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.titles = {}      # entity -> resolved page title (None if no page)
+        self.topics = {}      # (title, threshold) -> top 3 [{'topic', 'score'}] ([] if the API refused)
+        self.requests = 0
+        self.retries = 0
+        self._session = None
+        self._semaphore = None
+        self._limiters = {}
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(headers={"User-Agent": self.user_agent}, timeout=self.timeout)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = HostRateLimiter(self.rate_per_host)
+        return self._limiters[host]
+
+    async def _request_json(self, method, url, **kwargs):
+        """JSON body of a 200 response; None for a non-retried status; GAVE_UP once retries run out."""
+        limiter = self._limiter(url)
+        for attempt in range(self.max_retries + 1):
+            retry_after = 0.0
+            try:
+                async with self._semaphore:
+                    await limiter.wait()
+                    self.requests += 1
+                    async with self._session.request(method, url, **kwargs) as response:
+                        if response.status == 200:
+                            return await response.json(content_type=None)
+                        if response.status not in RETRY_STATUS:
+                            return None
+                        error = f"HTTP {response.status}"
+                        retry_after = float(response.headers.get("Retry-After", 0) or 0)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = repr(e)
+            if attempt == self.max_retries:
+                print(f"⚠️ Giving up on {url} after {attempt + 1} attempts: {error}")
+                return GAVE_UP
+            self.retries += 1
+            delay = random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+            await asyncio.sleep(max(delay, retry_after))
+
+    # --- Wikipedia titles ---
+    async def _resolve_batch(self, titles):
+        params = {"action": "query", "prop": "info", "redirects": "1", "format": "json",
+                  "formatversion": "2", "titles": "|".join(titles)}
+        data = await self._request_json("GET", self.wiki_api, params=params)
+        if data is GAVE_UP:
+            return {}   # transient failure: not cached, so a later call tries again
+        if data is None:
+            return {title: None for title in titles}   # refused (e.g. 400): cached as "no page"
+        query = data.get("query", {})
+        normalized = {n["from"]: n["to"] for n in query.get("normalized", [])}
+        redirects = {r["from"]: r["to"] for r in query.get("redirects", [])}
+        existing = {p["title"] for p in query.get("pages", [])
+                    if not p.get("missing") and not p.get("invalid")}
+        resolved = {}
+        for title in titles:
+            target = normalized.get(title, title)
+            target = redirects.get(target, target)
+            resolved[title] = target if target in existing else None
+        return resolved
+
+    async def resolve_titles(self, entities, desc=None):
+        """{entity: existing page title or None}; each distinct entity is queried once."""
+        todo = [e for e in dict.fromkeys(entities) if e not in self.titles]
+        # "|" separates titles in a query and cannot appear in one
+        for e in [e for e in todo if "|" in e or not e.strip()]:
+            self.titles[e] = None
+        todo = [e for e in todo if e not in self.titles]
+        batches = [todo[i:i + TITLES_PER_QUERY] for i in range(0, len(todo), TITLES_PER_QUERY)]
+        with tqdm(total=len(todo), desc=desc or "resolving titles", unit="entity", disable=not todo) as bar:
+            for done in asyncio.as_completed([self._resolve_batch(b) for b in batches]):
+                resolved = await done
+                self.titles.update(resolved)
+                bar.update(len(resolved))
+        return {e: self.titles.get(e) for e in entities}
+
+    # --- Outlink topic model ---
+    async def predict_topics(self, title, threshold=0.0):
+        """Top 3 {'topic', 'score'} for a page title (cached per title and threshold, [] on refusal)."""
+        key = (title, threshold)
+        if key not in self.topics:
+            payload = {"page_title": title.replace(" ", "_"), "lang": self.lang, "threshold": threshold}
+            data = await self._request_json("POST", self.topic_api, json=payload)
+            if data is GAVE_UP:
+                return []   # transient failure: not cached, so a later call tries again
+            predictions = []
+            if data is not None and "prediction" in data:
+                predictions = sorted(data["prediction"]["results"], key=lambda x: x["score"], reverse=True)[:3]
+            self.topics[key] = predictions
+        return self.topics[key]
+
+    async def predict_topics_many(self, titles, threshold=0.0, desc=None):
+        """{title: top 3} for every distinct title, requested concurrently."""
+        titles = list(dict.fromkeys(titles))
+
+        async def one(title):
+            return title, await self.predict_topics(title, threshold)
+
+        out = {}
+        with tqdm(total=len(titles), desc=desc or "predicting topics", unit="title", disable=not titles) as bar:
+            for done in asyncio.as_completed([one(t) for t in titles]):
+                title, predictions = await done
+                out[title] = predictions
+                bar.update(1)
+        return out
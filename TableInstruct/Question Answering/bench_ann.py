@@ -0,0 +1,78 @@
+# ============================================================================================
+# Script: Recall / latency benchmark — IVFIndex vs exact brute-force search (ann_index)
+# --------------------------------------------------------------------------------------------
+# Builds an IVF index over table embeddings and compares it with ExactIndex on the same
+# query batch: recall@K (share of the exact top-K found) and ms per query for each n_probe.
+#
+# Input: TABLE_VECTORS / QUERY_VECTORS .npy files (e.g. r2.py table embeddings and the
+# per-question embeddings r2.py queries _neighbours.csv with). When they are not set or
+# missing, a synthetic clustered set of normalized 384-d vectors (MiniLM size) is used, with
+# queries drawn near random table vectors.
+# Run from this folder:  python bench_ann.py
+# ============================================================================================
+
+import os
+import time
+import numpy as np
+
+from ann_index import ExactIndex, IVFIndex
+
+TABLE_VECTORS = None   # path to an (n_tables, dim) .npy
+QUERY_VECTORS = None   # path to an (n_queries, dim) .npy
+K = 10
+N_PROBES = [1, 2, 4, 8, 16, 32]
+
+# Synthetic fallback
+N_TABLES = 50_000
+N_QUERIES = 1_000
+DIM = 384
+N_TOPICS = 200
+SEED = 0
+
+def _normalize(x):
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+def synthetic(seed=SEED):
+    rng = np.random.RandomState(seed)
+    topics = rng.randn(N_TOPICS, DIM)
+    tables = _normalize(topics[rng.randint(N_TOPICS, size=N_TABLES)] + 0.6 * rng.randn(N_TABLES, DIM))
+    queries = _normalize(tables[rng.randint(N_TABLES, size=N_QUERIES)] + 0.04 * rng.randn(N_QUERIES, DIM))
+    return tables, queries
+
+def load_vectors():
+    if TABLE_VECTORS and QUERY_VECTORS and os.path.exists(TABLE_VECTORS) and os.path.exists(QUERY_VECTORS):
+        print(f"📂 {TABLE_VECTORS} / {QUERY_VECTORS}")
+        return (np.load(TABLE_VECTORS).astype(np.float32),
+                np.load(QUERY_VECTORS).astype(np.float32))
+    print(f"🧪 Synthetic: {N_TABLES} tables, {N_QUERIES} queries, dim {DIM}, {N_TOPICS} topics")
+    return synthetic()
+
+def recall_at_k(found, truth):
+    hits = sum(len(np.intersect1d(f[f >= 0], t[t >= 0])) for f, t in zip(found, truth))
+    return hits / max(int((truth >= 0).sum()), 1)
+
+def main():
+    tables, queries = load_vectors()
+
+    exact = ExactIndex(tables)
+    t0 = time.perf_counter()
+    _, truth = exact.search(queries, K)
+    t_exact = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ivf = IVFIndex(tables)
+    t_build = time.perf_counter() - t0
+    print(f"🏗️ IVF build: {ivf.n_lists} lists over {len(tables)} vectors in {t_build:.1f}s")
+    print(f"📏 exact: {t_exact / len(queries) * 1e3:.3f} ms/query")
+
+    print(f"{'n_probe':>8}{'recall@' + str(K):>11}{'ms/query':>10}{'speedup':>9}")
+    for n_probe in N_PROBES:
+        if n_probe > ivf.n_lists:
+            break
+        t0 = time.perf_counter()
+        _, found = ivf.search(queries, K, n_probe=n_probe)
+        t = time.perf_counter() - t0
+        print(f"{n_probe:>8}{recall_at_k(found, truth):>11.3f}{t / len(queries) * 1e3:>10.3f}{t_exact / t:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# ============================================================================================
+# Script: Scaling benchmark — CpuEncodePool at 1, 2, 4, 8, 16 workers (CPU only)
+# --------------------------------------------------------------------------------------------
+# Encodes the same texts (TQAS tables + questions, punctuation-free like r2.py) with:
+#   - the plain single-process SentenceTransformer (torch default threads), and
+#   - cpu_pool.CpuEncodePool for each worker count in WORKERS,
+# and reports texts/s, speedup over the single process, and the max |Δ| of the embeddings.
+# Worker start-up (model load) is timed separately and not counted in texts/s.
+# Run from this folder:  python bench_cpu_pool.py
+# ============================================================================================
+
+import os
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import csv
+import re
+import string
+import time
+import numpy as np
+
+from cpu_pool import CpuEncodePool
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+MAX_SEQ_LENGTH = 256
+BATCH_SIZE = 64
+WORKERS = [1, 2, 4, 8, 16]
+N_TEXTS = 4000
+TQAS_DIR = "TQAS"
+
+def load_texts():
+    texts = []
+    csv.field_size_limit(1 << 30)
+    for fn in sorted(os.listdir(TQAS_DIR)):
+        if not fn.endswith(".csv"):
+            continue
+        with open(os.path.join(TQAS_DIR, fn), "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                texts.append(row["table"])
+                texts.append(row["question"])
+                if len(texts) >= N_TEXTS:
+                    break
+    punct = re.compile(rf"[{re.escape(string.punctuation)}]")
+    # Longest first, as EmbeddingEngine sends them
+    return sorted((punct.sub("", t) for t in texts[:N_TEXTS]), key=len, reverse=True)
+
+def main():
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    texts = load_texts()
+    print(f"🧪 {len(texts)} texts, {os.cpu_count()} cores, batch_size={BATCH_SIZE}, max_seq_length={MAX_SEQ_LENGTH}")
+
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    model.max_seq_length = MAX_SEQ_LENGTH
+    t0 = time.perf_counter()
+    ref = model.encode(texts, batch_size=BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True)
+    t_ref = time.perf_counter() - t0
+    print(f"{'workers':>8}{'threads':>9}{'startup s':>11}{'texts/s':>10}{'speedup':>9}{'max |Δ|':>10}")
+    print(f"{'single':>8}{torch.get_num_threads():>9}{'-':>11}{len(texts) / t_ref:>10.1f}{1.0:>8.2f}x{0.0:>10.1e}")
+
+    for n in WORKERS:
+        t0 = time.perf_counter()
+        pool = CpuEncodePool(MODEL_NAME, n_workers=n, max_seq_length=MAX_SEQ_LENGTH)
+        pool.encode(texts[:n * 32], batch_size=8)   # ~one task per worker: wait for the models
+        t_start = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        emb = pool.encode(texts, batch_size=BATCH_SIZE, normalize_embeddings=True)
+        t = time.perf_counter() - t0
+        pool.close()
+        print(f"{n:>8}{pool.threads_per_worker:>9}{t_start:>11.1f}{len(texts) / t:>10.1f}"
+              f"{t_ref / t:>8.2f}x{np.abs(emb - ref).max():>10.1e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# ============================================================================================
+# Script: Accuracy / speed check — ONNX Runtime backend vs the PyTorch SentenceTransformer
+# --------------------------------------------------------------------------------------------
+# Scores (table, question) pairs from ./TQAS the way relatedness.py does (cleaned, punctuation
+# removed, normalized embeddings, cosine similarity) with:
+#   - torch      SentenceTransformer (reference)
+#   - onnx       fp32 exported graph
+#   - onnx-int8  dynamically quantized graph
+# and reports max / mean |Δ similarity| against the reference, how many pairs exceed
+# TOLERANCE, and texts/s. Exits with status 1 if a backend's max |Δ| is over its tolerance.
+# Run from this folder:  python check_onnx_backend.py
+# ============================================================================================
+
+import os
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import csv
+import re
+import string
+import sys
+import time
+import numpy as np
+
+# Shared utilities live one level up (TableInstruct/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from seg_cleaner import clean_input_seg
+
+from onnx_backend import load_onnx_encoder
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+MAX_SEQ_LENGTH = 256
+BATCH_SIZE = 64
+N_PAIRS = 1000
+TQAS_DIR = "TQAS"
+TOLERANCE = {"onnx": 1e-3, "onnx-int8": 0.05}   # max |Δ cosine| allowed vs torch
+
+_PUNCT = re.compile(rf"[{re.escape(string.punctuation)}]")
+
+def load_pairs():
+    tables, questions = [], []
+    csv.field_size_limit(1 << 30)
+    for fn in sorted(os.listdir(TQAS_DIR)):
+        if not fn.endswith(".csv"):
+            continue
+        with open(os.path.join(TQAS_DIR, fn), "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                tables.append(_PUNCT.sub("", clean_input_seg(row["table"])))
+                questions.append(_PUNCT.sub("", row["question"]))
+    return tables[:N_PAIRS], questions[:N_PAIRS]
+
+def similarities(encoder, tables, questions):
+    t0 = time.perf_counter()
+    a = encoder.encode(tables, batch_size=BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True)
+    b = encoder.encode(questions, batch_size=BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True)
+    seconds = time.perf_counter() - t0
+    return np.einsum("ij,ij->i", a, b), (len(tables) + len(questions)) / seconds
+
+def main():
+    from sentence_transformers import SentenceTransformer
+
+    tables, questions = load_pairs()
+    print(f"🧪 {len(tables)} (table, question) pairs, max_seq_length={MAX_SEQ_LENGTH}")
+
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    model.max_seq_length = MAX_SEQ_LENGTH
+    ref, ref_rate = similarities(model, tables, questions)
+
+    print(f"{'backend':<11}{'texts/s':>9}{'speedup':>9}{'max |Δ|':>10}{'mean |Δ|':>10}{'> tol':>7}")
+    print(f"{'torch':<11}{ref_rate:>9.1f}{1.0:>8.2f}x{0.0:>10.1e}{0.0:>10.1e}{0:>7}")
+    failed = False
+    for backend, tol in TOLERANCE.items():
+        encoder = load_onnx_encoder(MODEL_NAME, quantized=backend == "onnx-int8", max_seq_length=MAX_SEQ_LENGTH)
+        sims, rate = similarities(encoder, tables, questions)
+        diff = np.abs(sims - ref)
+        over = int((diff > tol).sum())
+        failed |= diff.max() > tol
+        print(f"{backend:<11}{rate:>9.1f}{rate / ref_rate:>8.2f}x{diff.max():>10.1e}{diff.mean():>10.1e}{over:>7}")
+
+    print("❌ Outside tolerance" if failed else "✅ All backends within tolerance")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
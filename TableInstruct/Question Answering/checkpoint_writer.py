@@ -0,0 +1,168 @@
+# ============================================================================================
+# Module: Append-only, checkpointed CSV writer for long classification runs
+# --------------------------------------------------------------------------------------------
+# qadomain.py kept every classified row in memory and wrote QAdomain-verification.csv at the
+# very end; domain-bart.py wrote once per input file. A crash late in a multi-hour BART run
+# lost everything. CheckpointWriter instead:
+#   - appends rows to the output CSV and flushes them every flush_every rows,
+#   - records each flushed batch in <output>.manifest — one content-hash key per row followed
+#     by a "#commit <csv size> <rows>" line, written only after the CSV bytes are fsynced,
+#   - on restart (resume=True) reads the manifest, truncates the CSV back to the last commit
+#     (rows written after it are dropped and redone) and exposes the committed keys, so the
+#     caller skips rows that were already classified.
+# Only an interrupted run over the same inputs resumes. The manifest starts with an
+# "#input <id>" line (input_fingerprint(): path, size and mtime of every input file) and a
+# clean close() appends "#complete"; when the ids differ, the id is missing or the last run
+# completed, the CSV and manifest are reset so no stale rows survive an input change.
+#
+# row_keys() hashes the fields that define a row's input (blake2b-128) plus its occurrence
+# number among identical rows, so duplicate inputs are still written once each and keys do
+# not depend on row position.
+# ============================================================================================
+
+import os
+import csv
+import hashlib
+
+COMMIT_PREFIX = "#commit "
+INPUT_PREFIX = "#input "
+COMPLETE_LINE = "#complete"
+
+def row_key(*fields):
+    """128-bit hex digest of the given fields (unit-separator joined)."""
+    h = hashlib.blake2b(digest_size=16)
+    for field in fields:
+        h.update(str(field).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+def input_fingerprint(paths):
+    """128-bit hex digest of each input's path, size and mtime (changes when any input does)."""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        st = os.stat(path)
+        h.update(f"{os.path.abspath(path)}\x1f{st.st_size}\x1f{st.st_mtime_ns}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+def row_keys(rows):
+    """Keys for an iterable of field tuples; the n-th repeat of identical fields gets its own key."""
+    seen = {}
+    keys = []
+    for fields in rows:
+        fields = tuple(fields)
+        n = seen.get(fields, 0)
+        seen[fields] = n + 1
+        keys.append(row_key(*fields, n))
+    return keys
+
+class CheckpointWriter:
+    def __init__(self, path, columns, flush_every=256, resume=True, input_id=""):
+        self.path = path
+        self.manifest_path = path + ".manifest"
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self.input_id = input_id  # e.g. input_fingerprint(input paths)
+        self.done = set()        # keys of committed rows
+        self.written = 0         # rows committed by this writer
+        self._pending = []       # (key, row) not yet flushed
+
+        if resume:
+            self._recover()
+        else:
+            self._reset()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._csv = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._csv, fieldnames=self.columns, extrasaction="ignore",
+                                      lineterminator="\n")   # as pandas.to_csv
+        self._manifest = open(self.manifest_path, "a", encoding="utf-8")
+        if os.fstat(self._manifest.fileno()).st_size == 0:
+            self._commit_line(f"{INPUT_PREFIX}{self.input_id}\n")
+        if os.fstat(self._csv.fileno()).st_size == 0:
+            self._writer.writeheader()   # committed together with the first batch
+
+    def _reset(self):
+        for p in (self.path, self.manifest_path):
+            if os.path.exists(p):
+                os.remove(p)
+
+    def _recover(self):
+        """Loads committed keys; drops manifest lines and CSV bytes past the last commit."""
+        if not os.path.exists(self.manifest_path):
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                print(f"⚠️ {self.path} has no manifest — starting it from scratch")
+                os.truncate(self.path, 0)
+            return
+        committed, manifest_end, pos, batch = 0, 0, 0, []
+        input_id, complete = None, False
+        with open(self.manifest_path, "rb") as f:
+            for raw in f:
+                pos += len(raw)
+                if not raw.endswith(b"\n"):
+                    break                   # torn last line
+                line = raw.decode("utf-8").rstrip("\n")
+                if line.startswith(COMMIT_PREFIX):
+                    committed = int(line[len(COMMIT_PREFIX):].split()[0])
+                    self.done.update(batch)
+                    batch = []
+                    manifest_end = pos
+                elif line.startswith(INPUT_PREFIX):
+                    input_id = line[len(INPUT_PREFIX):]
+                    manifest_end = pos
+                elif line == COMPLETE_LINE:
+                    complete = True
+                else:
+                    batch.append(line)
+        if input_id != self.input_id or complete:
+            reason = "previous run completed" if input_id == self.input_id else "inputs changed"
+            print(f"🔄 {self.path}: {reason} — starting it from scratch")
+            self.done = set()
+            self._reset()
+            return
+        os.truncate(self.manifest_path, manifest_end)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > committed:
+            os.truncate(self.path, committed)
+        if self.done:
+            print(f"↩️ Resuming {self.path}: {len(self.done)} rows already classified")
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def write(self, key, row):
+        self._pending.append((key, row))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Appends pending rows to the CSV, fsyncs it, then commits their keys to the manifest."""
+        if not self._pending:
+            return
+        self._writer.writerows(row for _, row in self._pending)
+        self._csv.flush()
+        os.fsync(self._csv.fileno())
+        keys = [key for key, _ in self._pending]
+        size = os.fstat(self._csv.fileno()).st_size
+        self._commit_line("".join(k + "\n" for k in keys) + f"{COMMIT_PREFIX}{size} {len(keys)}\n")
+        self.done.update(keys)
+        self.written += len(keys)
+        self._pending = []
+
+    def _commit_line(self, text):
+        self._manifest.write(text)
+        self._manifest.flush()
+        os.fsync(self._manifest.fileno())
+
+    def close(self, complete=True):
+        """Flushes pending rows; complete=True marks the run finished (the next run starts over)."""
+        self.flush()
+        if complete:
+            self._commit_line(COMPLETE_LINE + "\n")
+        self._csv.close()
+        self._manifest.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # Rows classified before an exception are still worth keeping; only then can a rerun resume
+        self.close(complete=exc_type is None)
@@ -1,17 +1,15 @@
 import os
+import sys
 import csv
-import time
-import spacy
 import pandas as pd
 from tqdm import tqdm
-from transformers import pipeline
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
-
-# Test spaCy setup
-doc = nlp("Albert Einstein was a physicist.")
-print([(ent.text, ent.label_) for ent in doc.ents])
+# Shared utilities live one level up (TableInstruct/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry  # models load on first use, once per process
+from classification_cache import DEFAULT_PATH as SHARED_CLASSIFICATION_CACHE
+from entity_extraction import extract_entities_batch  # NER-only spaCy, nlp.pipe batches
+from checkpoint_writer import CheckpointWriter, row_keys, input_fingerprint  # append-only output + resume manifest
 
 # Configuration
 
@@ -22,6 +20,25 @@ OUTPUT_FOLDER = 'domain-verify/result'
 
 #OUTPUT_FOLDER = './question_domain_type'
 USER_AGENT = "TopicPredictorBot/1.0"
+BATCH_SIZE = 32  # (text, label) pairs per BART forward pass
+SPACY_BATCH_SIZE = 256  # texts per nlp.pipe batch
+SPACY_N_PROCESS = 1     # >1 runs spaCy in that many worker processes
+SPACY_MODEL = "en_core_web_sm"
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+CLASSIFICATION_CACHE = SHARED_CLASSIFICATION_CACHE  # SQLite score cache shared by all scripts; None disables
+ZERO_SHOT_BACKEND = 'bart'  # 'bart' (BART-large-MNLI pipeline) or 'bi-encoder' (faster approximation, bi_encoder_zero_shot.py)
+BI_ENCODER_MODEL = "all-MiniLM-L6-v2"
+BI_ENCODER_CALIBRATION = os.path.join('sample100domain', 'bi_encoder_calibration.json')  # written by eval_bi_encoder_zero_shot.py; None = raw cosines
+TIMING_LOG = os.path.join(OUTPUT_FOLDER, 'timings.log')  # one JSON line per run
+CHECKPOINT_EVERY = 256  # questions classified and flushed to the output CSV per checkpoint
+RESUME = True           # continue an interrupted run over an unchanged input; False always starts over
+
+OUTPUT_COLUMNS = [
+    "Top 1 Topic", "Top 1 Score",
+    "Top 2 Topic", "Top 2 Score",
+    "Top 3 Topic", "Top 3 Score",
+    "Entities", "Original Question"
+]
 
 # Labels for classification
 LABELS = [
@@ -30,70 +47,90 @@ LABELS = [
     "Political", "Society", "Science and Technology", "Environmental", "Healthcare and Medicine"
 ]
 
-# Create output folder if it doesn't exist
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+# --- Helper Functions ---
 
-# Initialize zero-shot classifier
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+def extract_entities(texts):
+    return extract_entities_batch(texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS,
+                                  nlp=model_registry.ner(SPACY_MODEL))
 
-# --- Helper Functions ---
+def zero_shot_classifier():
+    # BART pipeline or its bi-encoder approximation, per ZERO_SHOT_BACKEND (cached under separate model keys)
+    if ZERO_SHOT_BACKEND == 'bi-encoder':
+        return model_registry.bi_encoder_zero_shot(BI_ENCODER_MODEL, cache_path=CLASSIFICATION_CACHE,
+                                                   calibration_path=BI_ENCODER_CALIBRATION)
+    if ZERO_SHOT_BACKEND == 'bart':
+        return model_registry.zero_shot(ZERO_SHOT_MODEL, batch_size=BATCH_SIZE, cache_path=CLASSIFICATION_CACHE)
+    raise ValueError(f"Unknown ZERO_SHOT_BACKEND {ZERO_SHOT_BACKEND!r} (expected 'bart' or 'bi-encoder')")
 
-def extract_entities(text):
-    doc = nlp(text)
-    return list(set(ent.text for ent in doc.ents if len(ent.text) > 2))
+def predict_topics_with_zero_shot(texts, labels):
+    classifier = zero_shot_classifier()
+    return classifier.classify(texts, labels, multi_label=True, top_k=3)
 
-def predict_topics_with_zero_shot(text, labels):
-    result = classifier(text, labels, multi_label=True)
-    sorted_results = sorted(zip(result['labels'], result['scores']), key=lambda x: x[1], reverse=True)
-    return sorted_results[:3]
+def input_files():
+    if not os.path.isdir(INPUT_FOLDER):
+        return []
+    return sorted(f for f in os.listdir(INPUT_FOLDER) if f.endswith(".csv"))
 
 # --- Main Processing Loop ---
 
-for filename in os.listdir(INPUT_FOLDER):
-    if not filename.endswith(".csv"):
-        continue
-
-    input_path = os.path.join(INPUT_FOLDER, filename)
-    output_path = os.path.join(OUTPUT_FOLDER, filename)
+def main():
+    filenames = input_files()
+    if not filenames:
+        print(f"ℹ️ No CSV files in {INPUT_FOLDER} — nothing to do.")
+        model_registry.log_timings(TIMING_LOG, "domain-bart", files=0, rows=0)
+        return
 
-    try:
-        # Safer CSV reading
-        df_input = pd.read_csv(input_path, on_bad_lines='warn', quoting=csv.QUOTE_MINIMAL)
-    except Exception as e:
-        print(f"❌ Error reading {filename}: {e}")
-        continue
+    n_rows = 0
 
-    if 'question' not in df_input.columns:
-        print(f"⚠️ Skipping {filename} — no 'question' column found.")
-        continue
+    for filename in filenames:
+        input_path = os.path.join(INPUT_FOLDER, filename)
+        output_path = os.path.join(OUTPUT_FOLDER, filename)
 
-    rows = []
+        try:
+            # Safer CSV reading
+            df_input = pd.read_csv(input_path, on_bad_lines='warn', quoting=csv.QUOTE_MINIMAL)
+        except Exception as e:
+            print(f"❌ Error reading {filename}: {e}")
+            continue
 
-    for question in tqdm(df_input['question'].dropna(), desc=f"Processing {filename}", unit="question"):
-        text = str(question).strip()
-        if not text:
+        if 'question' not in df_input.columns:
+            print(f"⚠️ Skipping {filename} — no 'question' column found.")
             continue
 
-        entities = extract_entities(text)
-        predictions = predict_topics_with_zero_shot(text, LABELS)
-
-        top1_topic, top1_score = predictions[0][0], round(predictions[0][1], 4)
-        top2_topic, top2_score = predictions[1][0], round(predictions[1][1], 4)
-        top3_topic, top3_score = predictions[2][0], round(predictions[2][1], 4)
-
-        rows.append({
-            "Top 1 Topic": top1_topic,
-            "Top 1 Score": top1_score,
-            "Top 2 Topic": top2_topic,
-            "Top 2 Score": top2_score,
-            "Top 3 Topic": top3_topic,
-            "Top 3 Score": top3_score,
-            "Entities": ", ".join(entities),
-            "Original Question": text
-        })
-
-        time.sleep(0.1)  # polite delay to avoid rate limits
-
-    df_output = pd.DataFrame(rows)
-    df_output.to_csv(output_path, index=False)
-    print(f"\n✅ Saved: {output_path}")
+        texts = [t for t in (str(q).strip() for q in df_input['question'].dropna()) if t]
+        keys = row_keys((t,) for t in texts)
+
+        # Appended every CHECKPOINT_EVERY questions; rerunning an interrupted run over the same
+        # input skips questions already written, a completed run or a changed input starts over
+        with CheckpointWriter(output_path, OUTPUT_COLUMNS, flush_every=CHECKPOINT_EVERY, resume=RESUME,
+                              input_id=input_fingerprint([input_path])) as writer:
+            todo = [i for i, key in enumerate(keys) if key not in writer]
+            with tqdm(total=len(todo), desc=f"Processing {filename}", unit="question") as bar:
+                for start in range(0, len(todo), CHECKPOINT_EVERY):
+                    idx = todo[start:start + CHECKPOINT_EVERY]
+                    batch = [texts[i] for i in idx]
+                    all_predictions = predict_topics_with_zero_shot(batch, LABELS)
+                    all_entities = extract_entities(batch)
+
+                    for i, predictions, entities in zip(idx, all_predictions, all_entities):
+                        writer.write(keys[i], {
+                            "Top 1 Topic": predictions[0][0],
+                            "Top 1 Score": round(predictions[0][1], 4),
+                            "Top 2 Topic": predictions[1][0],
+                            "Top 2 Score": round(predictions[1][1], 4),
+                            "Top 3 Topic": predictions[2][0],
+                            "Top 3 Score": round(predictions[2][1], 4),
+                            "Entities": ", ".join(entities),
+                            "Original Question": texts[i]
+                        })
+                    bar.update(len(idx))
+
+        print(f"\n✅ Saved: {output_path}")
+        n_rows += writer.written
+
+    if CLASSIFICATION_CACHE:
+        zero_shot_classifier().cache.report()
+    model_registry.log_timings(TIMING_LOG, "domain-bart", files=len(filenames), rows=n_rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# ============================================================================================
+# Module: Persistent on-disk embedding cache
+# --------------------------------------------------------------------------------------------
+# Stores one embedding per distinct text so reruns of r2.py / relatedness.py only encode
+# texts they have never seen (and tables shared across train/test splits are encoded once).
+#
+# Layout — one namespace directory per (model name, max_seq_length, dtype):
+#   <cache_dir>/<model>__len<max_seq_length>__<dtype>/
+#       meta.json     {"model", "max_seq_length", "dtype", "dim"}
+#       keys.bin      16-byte blake2b digests of the whitespace-normalized texts, row order
+#       vectors.bin   row-major float16/float32 embeddings, memory-mapped for reads
+#
+# Both files are append-only. Vectors are flushed before their keys, so a run that dies
+# mid-write leaves at most some trailing bytes, which the next load truncates away.
+# ============================================================================================
+
+import os
+import re
+import json
+import hashlib
+import numpy as np
+
+KEY_BYTES = 16
+
+def text_key(text: str) -> bytes:
+    """128-bit digest of the whitespace-normalized text."""
+    return hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+def _namespace(model_name, max_seq_length, dtype):
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+    return f"{safe}__len{max_seq_length}__{np.dtype(dtype).name}"
+
+class EmbeddingCache:
+    def __init__(self, cache_dir, model_name, max_seq_length, dtype="float16"):
+        self.dtype = np.dtype(dtype)
+        self.path = os.path.join(cache_dir, _namespace(model_name, max_seq_length, self.dtype))
+        self.meta = {"model": model_name, "max_seq_length": max_seq_length,
+                     "dtype": self.dtype.name, "dim": None}
+        self._keys_path = os.path.join(self.path, "keys.bin")
+        self._vectors_path = os.path.join(self.path, "vectors.bin")
+        self._rows = {}        # digest -> row
+        self._vectors = None   # read-only memmap over the committed rows
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    # --- loading ---
+    def _load(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+        if self.meta["dim"] is None:
+            return
+
+        raw = b""
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                raw = f.read()
+        row_bytes = self.meta["dim"] * self.dtype.itemsize
+        vec_size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        n = min(len(raw) // KEY_BYTES, vec_size // row_bytes)
+        # Drop a torn tail from an interrupted run so the next append stays row-aligned
+        if os.path.exists(self._keys_path) and len(raw) != n * KEY_BYTES:
+            os.truncate(self._keys_path, n * KEY_BYTES)
+        if os.path.exists(self._vectors_path) and vec_size != n * row_bytes:
+            os.truncate(self._vectors_path, n * row_bytes)
+        self._rows = {raw[i * KEY_BYTES:(i + 1) * KEY_BYTES]: i for i in range(n)}
+        self._map(n)
+
+    def _map(self, n):
+        self._vectors = None
+        if n:
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r",
+                                      shape=(n, self.meta["dim"]))
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+
+    # --- access ---
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def missing(self, keys):
+        """Distinct keys (first-seen order) that are not cached yet."""
+        out, seen = [], set()
+        for k in keys:
+            if k not in self._rows and k not in seen:
+                seen.add(k)
+                out.append(k)
+        self.misses += len(out)
+        self.hits += len(keys) - len(out)
+        return out
+
+    def add(self, keys, vectors):
+        """Appends vectors (one row per key) for keys that are not cached yet."""
+        vectors = np.asarray(vectors)
+        if not len(keys):
+            return
+        if self.meta["dim"] is None:
+            self.meta["dim"] = int(vectors.shape[1])
+            self._write_meta()
+        elif vectors.shape[1] != self.meta["dim"]:
+            raise ValueError(f"embedding dim {vectors.shape[1]} does not match cache dim {self.meta['dim']}")
+
+        fresh = [i for i, k in enumerate(keys) if k not in self._rows]
+        if not fresh:
+            return
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors[fresh], dtype=self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._keys_path, "ab") as f:
+            f.write(b"".join(keys[i] for i in fresh))
+        for i in fresh:
+            self._rows[keys[i]] = len(self._rows)
+        self._map(len(self._rows))
+
+    def get(self, keys):
+        """float32 array with the cached vector of every key (KeyError if one is missing)."""
+        rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))
+        if self._vectors is None:
+            return np.zeros((0, self.meta["dim"] or 0), dtype=np.float32)
+        return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{len(self)} cached embeddings, {self.hits} hits / {self.misses} encoded ({rate:.1f}% hit rate)"
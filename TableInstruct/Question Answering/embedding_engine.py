@@ -0,0 +1,125 @@
+# ============================================================================================
+# Module: Batched embedding engine (SentenceTransformer)
+# --------------------------------------------------------------------------------------------
+# - encode(texts): sorts ALL texts by length once, encodes them in large chunks with
+#   normalize_embeddings=True (so padding inside each batch stays small), and returns a
+#   float32 numpy array in the original order.
+# - pair_similarity(left, right): cosine similarity of left[i] vs right[i] for every i,
+#   computed as one vectorized row-wise dot product of the normalized embeddings.
+#   pair_similarity_to(left_emb, right) does the same against precomputed left vectors
+#   (r2.py encodes each distinct table once and reuses its row for every file);
+#   row_similarity(left_emb, right_emb) when both sides are already encoded.
+# - report(): records/s and texts/s over everything encoded so far.
+# - cache=EmbeddingCache(...): only texts missing from the on-disk cache are encoded (each
+#   distinct text once); every returned row is read back from the cache so first runs and
+#   reruns give the same values.
+#
+# The model only needs a SentenceTransformer-style encode(texts, batch_size=...,
+# normalize_embeddings=..., convert_to_numpy=..., show_progress_bar=...) method.
+# ============================================================================================
+
+import time
+import numpy as np
+from tqdm import tqdm
+
+from embedding_cache import text_key
+
+class EmbeddingEngine:
+    def __init__(self, model, batch_size=64, chunk_size=8192, show_progress_bar=True, cache=None):
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size      # texts handed to model.encode per call
+        self.show_progress_bar = show_progress_bar
+        self.n_records = 0
+        self.n_texts = 0
+        self.seconds = 0.0
+
+    def _encode_sorted(self, texts):
+        """Encodes texts that are already sorted by length."""
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    def encode(self, texts, desc="encoding"):
+        """L2-normalized float32 embeddings, one row per text, in input order."""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return self._encode_all(texts, desc)
+
+        t0 = time.perf_counter()
+        keys = [text_key(t) for t in texts]
+        missing = set(self.cache.missing(keys))
+        if missing:
+            todo = {}
+            for k, t in zip(keys, texts):
+                if k in missing and k not in todo:
+                    todo[k] = t
+            encoded = self._encode_all(list(todo.values()), desc)
+            self.cache.add(list(todo), encoded)
+        out = self.cache.get(keys)
+        self.n_texts += len(texts)
+        self.seconds += time.perf_counter() - t0
+        return out
+
+    def _encode_all(self, texts, desc):
+        if self.cache is not None:
+            return self._encode_chunks(texts, desc)
+        t0 = time.perf_counter()
+        out = self._encode_chunks(texts, desc)
+        self.n_texts += len(texts)
+        self.seconds += time.perf_counter() - t0
+        return out
+
+    def _encode_chunks(self, texts, desc):
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        out = None
+        with tqdm(total=len(texts), desc=desc, unit="text", disable=not self.show_progress_bar, leave=False) as bar:
+            for start in range(0, len(order), self.chunk_size):
+                idx = order[start:start + self.chunk_size]
+                emb = np.asarray(self._encode_sorted([texts[i] for i in idx]), dtype=np.float32)
+                if out is None:
+                    out = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+                out[idx] = emb
+                bar.update(len(idx))
+        return out
+
+    def pair_similarity(self, left, right):
+        """Cosine similarity of each (left[i], right[i]) pair as a 1-D float array."""
+        if len(left) != len(right):
+            raise ValueError(f"pair_similarity needs equal lengths, got {len(left)} and {len(right)}")
+        a = self.encode(left, desc="encoding left")
+        b = self.encode(right, desc="encoding right")
+        self.n_records += len(left)
+        if not len(left):
+            return np.zeros(0, dtype=np.float32)
+        # Cosine similarity = dot product for normalized embeddings
+        return np.einsum("ij,ij->i", a, b)
+
+    def pair_similarity_to(self, left_emb, right):
+        """Like pair_similarity, with the left side given as already-normalized embeddings."""
+        if len(left_emb) != len(right):
+            raise ValueError(f"pair_similarity_to needs equal lengths, got {len(left_emb)} and {len(right)}")
+        return self.row_similarity(left_emb, self.encode(right, desc="encoding right"))
+
+    def row_similarity(self, left_emb, right_emb):
+        """Row-wise cosine similarity of two aligned arrays of normalized embeddings."""
+        self.n_records += len(left_emb)
+        if not len(left_emb):
+            return np.zeros(0, dtype=np.float32)
+        return np.einsum("ij,ij->i", left_emb, right_emb)
+
+    def report(self):
+        rate = self.n_records / self.seconds if self.seconds else 0.0
+        text_rate = self.n_texts / self.seconds if self.seconds else 0.0
+        line = (f"{self.n_records} records / {self.n_texts} texts in {self.seconds:.1f}s "
+                f"→ {rate:.1f} records/s ({text_rate:.1f} texts/s, batch_size={self.batch_size})")
+        if self.cache is not None:
+            line += f"; cache: {self.cache.report()}"
+        return line
@@ -0,0 +1,150 @@
+# ============================================================================================
+# Script: Single-pass multi-output extractor (QAS + TQAS + cleaned relatedness inputs)
+# --------------------------------------------------------------------------------------------
+# qaextractor.py and tqaextractor.py each decode the same seven JSON files. This engine
+# decodes every record once and hands it to a list of sinks, each of which writes its own
+# CSV per input file:
+#   - QasSink:     ./QAS/<name>.csv      (same rows/format as qaextractor.py)
+#   - TqasSink:    ./TQAS/<name>.csv     (same rows/format as tqaextractor.py)
+#   - CleanedSink: ./relatedness_inputs/<name>.csv  (question + table cleaned exactly as
+#                  relatedness.py does before encoding; columns: question, table)
+#
+# New outputs plug in by subclassing CsvSink and implementing row(item).
+# Records are streamed with ijson (json_records.iter_items), so memory stays flat. Sinks write
+# to <name>.csv.partial and replace their output only if the whole input file was read.
+# ============================================================================================
+
+import os
+import csv
+from abc import ABC, abstractmethod
+
+import qaextractor
+import tqaextractor
+import relatedness_text
+from json_records import iter_items, AtomicOutput
+
+INPUT_FILES = tqaextractor.INPUT_FILES  # (file name, dataset tag)
+
+# Dataset tag → qaextractor extraction function
+QAS_EXTRACTORS = {
+    "fetaqa": qaextractor.extract_fetaqa,
+    "hybridqa": qaextractor.extract_hybridqa,
+    "hitab": qaextractor.extract_standard,
+    "standard": qaextractor.extract_standard,
+}
+
+# ------------------------------------ sinks -------------------------------------
+
+class CsvSink(ABC):
+    """
+    Writes one CSV per input file into out_dir.
+    Subclasses set header/csv_kwargs and return a row (or None to skip) from row(item).
+    """
+
+    header = []
+    csv_kwargs = {}
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._output = None
+        self._writer = None
+        self.filename = None
+        self.dataset_tag = None
+        self.count = 0
+
+    def open(self, filename, dataset_tag):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.filename, self.dataset_tag = filename, dataset_tag
+        self.out_path = os.path.join(self.out_dir, os.path.basename(filename).replace(".json", ".csv"))
+        self._output = AtomicOutput(self.out_path)
+        self._writer = csv.writer(self._output.file, **self.csv_kwargs)
+        self._writer.writerow(self.header)
+        self.count = 0
+
+    @abstractmethod
+    def row(self, item):
+        """CSV row for one JSON record, or None to skip it."""
+
+    def write(self, item):
+        row = self.row(item)
+        if row is not None:
+            self._writer.writerow(row)
+            self.count += 1
+
+    def close(self, ok=True):
+        """Replaces the output with the new rows (ok) or drops them, keeping the old output."""
+        if ok:
+            self._output.commit()
+            print(f"  ✅ Saved: {self.out_path} ({self.count} rows)")
+        else:
+            self._output.discard()
+            print(f"  ⚠️ Kept previous {self.out_path} (new output discarded)")
+        self._output = self._writer = None
+
+class QasSink(CsvSink):
+    """question, answer — as written by qaextractor.py."""
+
+    header = ["question", "answer"]
+    csv_kwargs = {"quoting": csv.QUOTE_NONE, "escapechar": "\\"}
+
+    def row(self, item):
+        question, answer = QAS_EXTRACTORS[self.dataset_tag](item)
+        if question and answer:
+            return [question, answer]
+        return None
+
+class TqasSink(CsvSink):
+    """question, answer, table — as written by tqaextractor.py."""
+
+    header = ["question", "answer", "table"]
+    csv_kwargs = {"quoting": csv.QUOTE_MINIMAL, "lineterminator": "\n"}
+
+    def row(self, item):
+        q, a = tqaextractor.extract_question_answer(item, self.dataset_tag)
+        if q is None:
+            return None
+        return [q, a, tqaextractor.build_table_with_prefix(self.dataset_tag, item.get("input_seg", ""))]
+
+class CleanedSink(CsvSink):
+    """question, table — the cleaned text relatedness.py feeds to the encoder."""
+
+    header = ["question", "table"]
+    csv_kwargs = {"quoting": csv.QUOTE_MINIMAL, "lineterminator": "\n"}
+
+    def row(self, item):
+        raw_input_seg = item.get("input_seg", "")
+        question = relatedness_text.extract_question(item, self.filename)
+        if not raw_input_seg or not question:
+            return None
+        return [question, relatedness_text.clean_relatedness_seg(raw_input_seg)]
+
+# ------------------------------------ engine ------------------------------------
+
+def run(input_files, sinks, streaming=True):
+    """
+    Decodes each input file once and feeds every record to all sinks.
+    """
+    for filename, dataset_tag in input_files:
+        if not os.path.exists(filename):
+            print(f"Skip (not found): {filename}")
+            continue
+
+        print(f"🔍 Processing {filename} → {len(sinks)} outputs")
+        for sink in sinks:
+            sink.open(filename, dataset_tag)
+        ok = False
+        try:
+            for item in iter_items(filename, streaming):
+                for sink in sinks:
+                    sink.write(item)
+            ok = True
+        finally:
+            for sink in sinks:
+                sink.close(ok)
+
+if __name__ == "__main__":
+    run(INPUT_FILES, [
+        QasSink("QAS"),
+        TqasSink(tqaextractor.OUTPUT_DIR),
+        CleanedSink("relatedness_inputs"),
+    ])
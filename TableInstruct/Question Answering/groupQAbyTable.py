@@ -3,17 +3,38 @@
 # Changes per request:
 #   1) Column "qa_pairs_json" → "qas" (plain text: "Q1 A1 Q2 A2 ...")
 #   2) Column order: num_pairs, table, qas
+#   3) Groups key on a 128-bit content hash of the table (table_store.TableStore) instead of
+#      the raw table text. With WRITE_TABLE_STORE=True the *.gtqa.csv files carry
+#      num_pairs, table_id, qas and each distinct table body is written once to tables.csv.
+#   4) Out-of-core mode (MEMORY_CAP_BYTES): rows are spilled to hash partitions on disk by
+#      table id, each partition is grouped on its own, and the sorted runs are merged back
+#      into first-appearance order — same *.gtqa.csv / statistics.csv as the in-memory path.
+#      At most MAX_OPEN_FILES spill files are open at once: larger fan-outs spill through
+#      intermediate buckets and runs are merged in several passes.
+#   5) statistics.csv is computed with mergeable streaming stats (streaming_stats.py): no
+#      list of group sizes is kept, the ALL row merges the per-file stats, and p90/p99
+#      group sizes are reported after stdev.
 # ============================================================================================
 
 import os
 import csv
-import json
+import math
+import heapq
+import tempfile
 from collections import defaultdict
-from statistics import mean, median, pstdev
+
+from table_store import TableStore, table_id
+from streaming_stats import StreamingStats
 
 INPUT_DIR = "TQAS"
 OUTPUT_DIR = "GTQA"
 STATS_FILENAME = "statistics.csv"
+TABLE_STORE_FILENAME = "tables.csv"
+WRITE_TABLE_STORE = False  # True: reference tables by id and write each body once to tables.csv
+MEMORY_CAP_BYTES = None    # e.g. 512_000_000 → group inputs that may not fit via disk partitions
+SPILL_OVERHEAD = 3         # assumed in-memory bytes per input byte when sizing partitions
+TMP_DIR = None             # where partitions are spilled (None → system temp dir)
+MAX_OPEN_FILES = 64        # spill/run files open at once (keeps well under the ulimit -n)
 
 def _plain(s: str) -> str:
     """Collapse all whitespace/newlines to single spaces."""
@@ -34,10 +55,10 @@ def read_input_csv(path):
                 "table": row.get("table", ""),
             }
 
-def group_by_table(rows_iter):
-    groups = defaultdict(list)  # table -> list of {"question","answer"}
+def group_by_table(rows_iter, store):
+    groups = defaultdict(list)  # table id -> list of {"question","answer"}
     for r in rows_iter:
-        groups[r["table"]].append({"question": r["question"], "answer": r["answer"]})
+        groups[store.intern(r["table"])].append({"question": r["question"], "answer": r["answer"]})
     return groups
 
 def make_qas_plain_text(qa_list):
@@ -51,28 +72,149 @@ def make_qas_plain_text(qa_list):
             parts.append((q + " " + a).strip())
     return " ".join(parts).strip()
 
-def write_grouped_csv(out_path, groups):
-    # Column order: num_pairs, table, qas
-    header = ["num_pairs", "table", "qas"]
+def write_grouped_csv(out_path, groups, store):
+    # Column order: num_pairs, table, qas (table_id instead of table when bodies live in the store file)
+    inline = store.keep_bodies
+    header = ["num_pairs", "table" if inline else "table_id", "qas"]
     with open(out_path, "w", encoding="utf-8", newline="") as f:
         w = csv.writer(f, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
         w.writerow(header)
-        for table_text, qa_list in groups.items():
+        for tid, qa_list in groups.items():
             qas_text = make_qas_plain_text(qa_list)
-            w.writerow([len(qa_list), table_text, qas_text])
+            w.writerow([len(qa_list), store.get(tid) if inline else tid, qas_text])
+
+STATS_HEADER = ["filename", "num_tables", "total_qas", "mean", "median", "stdev", "p90", "p99"]
 
-def collect_stats_for_file(groups):
-    counts = [len(v) for v in groups.values()]
-    if not counts:
-        return {"num_tables": 0, "total_qas": 0, "mean": 0.0, "median": 0.0, "stdev": 0.0}
+def summarize_stats(stats):
+    """Row values for statistics.csv from a StreamingStats of group sizes."""
     return {
-        "num_tables": len(counts),
-        "total_qas": sum(counts),
-        "mean": float(mean(counts)),
-        "median": float(median(counts)),
-        "stdev": float(pstdev(counts)),
+        "num_tables": stats.n,
+        "total_qas": stats.total,
+        "mean": float(stats.mean),
+        "median": float(stats.median),
+        "stdev": float(stats.pstdev),
+        "p90": float(stats.quantile(0.90)),
+        "p99": float(stats.quantile(0.99)),
     }
 
+def stats_csv_row(filename, summary):
+    return [
+        filename,
+        summary["num_tables"],
+        summary["total_qas"],
+        f"{summary['mean']:.6f}",
+        f"{summary['median']:.6f}",
+        f"{summary['stdev']:.6f}",
+        f"{summary['p90']:.6f}",
+        f"{summary['p99']:.6f}",
+    ]
+
+# ------------------------------ out-of-core grouping ------------------------------
+
+def num_partitions(in_path):
+    """1 when the input fits under MEMORY_CAP_BYTES (or no cap is set), else the spill fan-out."""
+    if not MEMORY_CAP_BYTES:
+        return 1
+    return max(1, math.ceil(os.path.getsize(in_path) * SPILL_OVERHEAD / MEMORY_CAP_BYTES))
+
+def _read_rows(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.reader(f)
+
+def _read_run(path):
+    for first_row, num_pairs, table_col, qas_text in _read_rows(path):
+        yield int(first_row), num_pairs, table_col, qas_text
+
+def _temp_path(tmp):
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=tmp)
+    os.close(fd)
+    return path
+
+def _spill(records, paths, key, tmp):
+    """
+    Writes each record to paths[key(record)] with at most MAX_OPEN_FILES files open: with
+    more paths, records first go to MAX_OPEN_FILES buckets (key % k) and each bucket is then
+    spilled to its own paths[b::k] (index key // k).
+    """
+    k = MAX_OPEN_FILES
+    if len(paths) <= k:
+        files = [open(p, "w", encoding="utf-8", newline="") for p in paths]
+        try:
+            writers = [csv.writer(f, lineterminator="\n") for f in files]
+            for rec in records:
+                writers[key(rec)].writerow(rec)
+        finally:
+            for f in files:
+                f.close()
+        return
+    bucket_paths = [_temp_path(tmp) for _ in range(k)]
+    _spill(records, bucket_paths, lambda rec: key(rec) % k, tmp)
+    for b, bucket_path in enumerate(bucket_paths):
+        _spill(_read_rows(bucket_path), paths[b::k], lambda rec: key(rec) // k, tmp)
+        os.remove(bucket_path)
+
+def _merge_runs(run_paths, tmp):
+    """Merges runs MAX_OPEN_FILES at a time until one pass can merge the rest; yields its rows."""
+    while len(run_paths) > MAX_OPEN_FILES:
+        merged = []
+        for j in range(0, len(run_paths), MAX_OPEN_FILES):
+            batch = run_paths[j:j + MAX_OPEN_FILES]
+            path = _temp_path(tmp)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f, lineterminator="\n").writerows(heapq.merge(*(_read_run(p) for p in batch)))
+            for p in batch:
+                os.remove(p)
+            merged.append(path)
+        run_paths = merged
+    yield from heapq.merge(*(_read_run(p) for p in run_paths))
+
+def group_out_of_core(rows_iter, out_path, n_partitions, store=None):
+    """
+    Groups rows by table with only one partition in memory at a time and writes out_path
+    exactly like write_grouped_csv (groups in first-appearance order, Q/A in file order).
+    With a store, tables are written as ids and bodies go to the store.
+    Returns a StreamingStats of the group sizes.
+    """
+    csv.field_size_limit(1 << 30)
+    with tempfile.TemporaryDirectory(prefix="gtqa-", dir=TMP_DIR) as tmp:
+        # 1) Spill each row, tagged with its row number, to the partition of its table id
+        part_paths = [os.path.join(tmp, f"part{p}.csv") for p in range(n_partitions)]
+        records = ([i, table_id(r["table"]), r["table"], r["question"], r["answer"]]
+                   for i, r in enumerate(rows_iter))
+        _spill(records, part_paths, lambda rec: int(rec[1][:8], 16) % n_partitions, tmp)
+
+        # 2) Group each partition in memory → run file sorted by first appearance
+        run_paths = []
+        for p, part_path in enumerate(part_paths):
+            groups = {}  # table id -> [first row, table, list of {"question","answer"}]
+            with open(part_path, "r", encoding="utf-8", newline="") as f:
+                for i, tid, table, q, a in csv.reader(f):
+                    g = groups.get(tid)
+                    if g is None:
+                        g = groups[tid] = [int(i), table, []]
+                    g[2].append({"question": q, "answer": a})
+            os.remove(part_path)
+
+            run_path = os.path.join(tmp, f"run{p}.csv")
+            with open(run_path, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f, lineterminator="\n")
+                for first_row, table, qa_list in sorted(groups.values(), key=lambda g: g[0]):
+                    table_col = store.intern(table) if store is not None else table
+                    w.writerow([first_row, len(qa_list), table_col, make_qas_plain_text(qa_list)])
+            run_paths.append(run_path)
+            del groups
+
+        # 3) k-way merge of the runs back into first-appearance order
+        stats = StreamingStats()
+        header = ["num_pairs", "table" if store is None else "table_id", "qas"]
+        with open(out_path, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+            w.writerow(header)
+            for _, num_pairs, table_col, qas_text in _merge_runs(run_paths, tmp):
+                w.writerow([num_pairs, table_col, qas_text])
+                stats.add(int(num_pairs))
+    return stats
+
 def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -83,61 +225,54 @@ def main():
     if not input_files:
         raise SystemExit(f"No CSV files found in '{INPUT_DIR}'.")
 
-    all_counts = []
+    overall_stats = StreamingStats()
     per_file_stats_rows = []
 
+    # One shared store streams every distinct table to tables.csv once across all files;
+    # otherwise a per-file store keeps the bodies needed for the inline table column.
+    shared_store = None
+    if WRITE_TABLE_STORE:
+        shared_store = TableStore(os.path.join(OUTPUT_DIR, TABLE_STORE_FILENAME), keep_bodies=False)
+
     for fn in sorted(input_files):
         in_path = os.path.join(INPUT_DIR, fn)
         base = os.path.splitext(fn)[0]
         out_path = os.path.join(OUTPUT_DIR, f"{base}.gtqa.csv")
 
         rows_iter = read_input_csv(in_path)
-        groups = group_by_table(rows_iter)
-
-        write_grouped_csv(out_path, groups)
+        n_parts = num_partitions(in_path)
+        if n_parts > 1:
+            print(f"Grouping {fn} out of core ({n_parts} partitions)")
+            file_stats = group_out_of_core(rows_iter, out_path, n_parts, shared_store)
+        else:
+            store = shared_store if shared_store is not None else TableStore()
+            groups = group_by_table(rows_iter, store)
+            write_grouped_csv(out_path, groups, store)
+            file_stats = StreamingStats(len(v) for v in groups.values())
+            del groups
 
-        stats = collect_stats_for_file(groups)
+        stats = summarize_stats(file_stats)
         per_file_stats_rows.append({"filename": fn, **stats})
-        all_counts.extend([len(v) for v in groups.values()])
+        overall_stats.merge(file_stats)
 
         print(f"Processed: {fn} → {os.path.basename(out_path)} "
               f"(tables: {stats['num_tables']}, QAs: {stats['total_qas']})")
 
-    # Overall row
-    if all_counts:
-        overall = {
-            "filename": "ALL",
-            "num_tables": len(all_counts),
-            "total_qas": sum(all_counts),
-            "mean": float(mean(all_counts)),
-            "median": float(median(all_counts)),
-            "stdev": float(pstdev(all_counts)),
-        }
-    else:
-        overall = {"filename": "ALL", "num_tables": 0, "total_qas": 0, "mean": 0.0, "median": 0.0, "stdev": 0.0}
-
-    # Write statistics.csv (unchanged schema)
+    if shared_store is not None:
+        shared_store.close()
+        print(f"Saved table store: {shared_store.path} ({len(shared_store)} distinct tables)")
+
+    # Overall row (merged per-file stats)
+    overall = {"filename": "ALL", **summarize_stats(overall_stats)}
+
+    # Write statistics.csv
     stats_path = os.path.join(OUTPUT_DIR, STATS_FILENAME)
     with open(stats_path, "w", encoding="utf-8", newline="") as f:
         w = csv.writer(f, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
-        w.writerow(["filename", "num_tables", "total_qas", "mean", "median", "stdev"])
+        w.writerow(STATS_HEADER)
         for row in per_file_stats_rows:
-            w.writerow([
-                row["filename"],
-                row["num_tables"],
-                row["total_qas"],
-                f"{row['mean']:.6f}",
-                f"{row['median']:.6f}",
-                f"{row['stdev']:.6f}",
-            ])
-        w.writerow([
-            overall["filename"],
-            overall["num_tables"],
-            overall["total_qas"],
-            f"{overall['mean']:.6f}",
-            f"{overall['median']:.6f}",
-            f"{overall['stdev']:.6f}",
-        ])
+            w.writerow(stats_csv_row(row["filename"], row))
+        w.writerow(stats_csv_row(overall["filename"], overall))
 
     print(f"Saved statistics: {stats_path}")
 
@@ -0,0 +1,57 @@
+# ============================================================================================
+# Module: Shared record reading and safe output writing for the QA extractors
+# --------------------------------------------------------------------------------------------
+# Used by qaextractor.py, tqaextractor.py and extract_all.py:
+#   - iter_items(file_name) streams the records of a JSON array file (ijson), or loads the
+#     whole file with json.load when streaming=False,
+#   - AtomicOutput writes to "<path>.partial" and only os.replace()s it over <path> once
+#     the whole output has been written, so a missing or malformed input (or any other
+#     error mid-way) leaves the previous good output untouched.
+# ============================================================================================
+
+import os
+import json
+import ijson
+
+PARTIAL_SUFFIX = ".partial"
+
+def iter_items(file_name, streaming=True):
+    """
+    Yields the records of a JSON array file one at a time.
+    With streaming=True records are decoded incrementally by ijson; otherwise the whole
+    file is parsed with json.load first.
+    """
+    with open(file_name, "rb") as f:
+        if streaming:
+            yield from ijson.items(f, "item", use_float=True)
+        else:
+            yield from json.load(f)
+
+class AtomicOutput:
+    """
+    Text file opened at <path>.partial; commit() moves it over path, discard() deletes it.
+    As a context manager it commits on success and discards on any exception.
+    """
+
+    def __init__(self, path, newline="", encoding="utf-8"):
+        self.path = path
+        self.tmp_path = path + PARTIAL_SUFFIX
+        self.file = open(self.tmp_path, "w", newline=newline, encoding=encoding)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
@@ -0,0 +1,119 @@
+# ============================================================================================
+# Module: ONNX Runtime backend for the MiniLM sentence encoder
+# --------------------------------------------------------------------------------------------
+# export_onnx(model_name, out_dir)  exports the Hugging Face encoder ONCE to
+#                                   out_dir/model.onnx (dynamic batch/sequence axes), writes
+#                                   a dynamically int8-quantized copy model.int8.onnx
+#                                   (onnxruntime.quantization.quantize_dynamic) and saves the
+#                                   tokenizer next to them.
+# OnnxEncoder(out_dir, quantized)   runs the graph with onnxruntime on CPU (all graph
+#                                   optimizations on) and reproduces the SentenceTransformer
+#                                   head of all-MiniLM-L6-v2: mean pooling over the attention
+#                                   mask, then optional L2 normalization.
+#
+# OnnxEncoder has the SentenceTransformer encode(texts, batch_size=..., normalize_embeddings=
+# ..., convert_to_numpy=..., show_progress_bar=...) call plus .tokenizer / .max_seq_length,
+# so EmbeddingEngine, the embedding cache and table_chunks use it unchanged.
+# check_onnx_backend.py compares its similarities with the PyTorch path.
+#
+# Requirements (only for this backend):
+#   pip install onnx onnxruntime transformers torch
+# ============================================================================================
+
+import os
+import numpy as np
+
+ONNX_DIR = ".onnx_models"
+OPSET = 14
+
+def hf_name(model_name):
+    """Hub id of a sentence-transformers short name ('all-MiniLM-L6-v2' → 'sentence-transformers/...')."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+def model_dir(model_name, root=ONNX_DIR):
+    return os.path.join(root, hf_name(model_name).replace("/", "__"))
+
+def export_onnx(model_name, out_dir=None, quantize=True):
+    """Exports (and int8-quantizes) the encoder into out_dir; skips files that already exist."""
+    out_dir = out_dir or model_dir(model_name)
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    int8_path = os.path.join(out_dir, "model.int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        os.makedirs(out_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(hf_name(model_name))
+        encoder = AutoModel.from_pretrained(hf_name(model_name)).eval()
+
+        class _LastHidden(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, input_ids, attention_mask, token_type_ids):
+                return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                                  token_type_ids=token_type_ids)[0]
+
+        dummy = tokenizer(["export a table", "and a question"], padding=True, return_tensors="pt")
+        axes = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                _LastHidden(encoder),
+                (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={"input_ids": axes, "attention_mask": axes,
+                              "token_type_ids": axes, "last_hidden_state": axes},
+                opset_version=OPSET,
+            )
+        tokenizer.save_pretrained(out_dir)
+        print(f"📦 Exported {hf_name(model_name)} → {fp32_path}")
+
+    if quantize and not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"📦 Quantized (dynamic int8) → {int8_path}")
+    return out_dir
+
+class OnnxEncoder:
+    def __init__(self, out_dir, quantized=True, max_seq_length=256, intra_op_threads=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.path = os.path.join(out_dir, "model.int8.onnx" if quantized else "model.onnx")
+        self.tokenizer = AutoTokenizer.from_pretrained(out_dir)
+        self.max_seq_length = max_seq_length
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self._inputs = [i.name for i in self.session.get_inputs()]
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, convert_to_numpy=True,
+               show_progress_bar=False):
+        """Mean-pooled sentence embeddings (numpy float32), one row per text, input order."""
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        out = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                   max_length=self.max_seq_length, return_tensors="np")
+            feed = {name: batch[name].astype(np.int64) for name in self._inputs}
+            hidden = self.session.run(None, feed)[0]
+            mask = batch["attention_mask"][..., None].astype(np.float32)
+            emb = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if normalize_embeddings:
+                emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+            out.append(emb.astype(np.float32))
+        emb = np.concatenate(out) if out else np.zeros((0, 0), dtype=np.float32)
+        return emb[0] if single else emb
+
+def load_onnx_encoder(model_name, quantized=True, max_seq_length=256, root=ONNX_DIR):
+    """Exports on first use, then returns an OnnxEncoder for the fp32 or int8 graph."""
+    out_dir = export_onnx(model_name, model_dir(model_name, root), quantize=quantized)
+    return OnnxEncoder(out_dir, quantized=quantized, max_seq_length=max_seq_length)
@@ -1,27 +1,43 @@
 import os
+import sys
 import csv
-import time
-import spacy
 import pandas as pd
 from tqdm import tqdm
-from transformers import pipeline
 
-# -----------------------------
-# Setup
-# -----------------------------
-
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
-
-# Optional quick check
-doc = nlp("Albert Einstein was a physicist.")
-print([(ent.text, ent.label_) for ent in doc.ents])
+# Shared utilities live one level up (TableInstruct/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry  # models load on first use, once per process
+from classification_cache import DEFAULT_PATH as SHARED_CLASSIFICATION_CACHE
+from entity_extraction import extract_entities_batch  # NER-only spaCy, nlp.pipe batches
+from checkpoint_writer import CheckpointWriter, row_keys, input_fingerprint  # append-only output + resume manifest
 
+# -----------------------------
 # Configuration
+# -----------------------------
 INPUT_FOLDER = 'sample100domain'      # folder containing input CSVs
 OUTPUT_FOLDER = 'sample100domain'     # final output folder
 OUTPUT_FILE = os.path.join(OUTPUT_FOLDER, 'QAdomain-verification.csv')
 USER_AGENT = "TopicPredictorBot/1.0"
+BATCH_SIZE = 32  # (text, label) pairs per BART forward pass
+SPACY_BATCH_SIZE = 256  # texts per nlp.pipe batch
+SPACY_N_PROCESS = 1     # >1 runs spaCy in that many worker processes
+SPACY_MODEL = "en_core_web_sm"
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+CLASSIFICATION_CACHE = SHARED_CLASSIFICATION_CACHE  # SQLite score cache shared by all scripts; None disables
+ZERO_SHOT_BACKEND = 'bart'  # 'bart' (BART-large-MNLI pipeline) or 'bi-encoder' (faster approximation, bi_encoder_zero_shot.py)
+BI_ENCODER_MODEL = "all-MiniLM-L6-v2"
+BI_ENCODER_CALIBRATION = os.path.join('sample100domain', 'bi_encoder_calibration.json')  # written by eval_bi_encoder_zero_shot.py; None = raw cosines
+TIMING_LOG = os.path.join(OUTPUT_FOLDER, 'timings.log')  # one JSON line per run
+CHECKPOINT_EVERY = 256  # rows classified and flushed to OUTPUT_FILE per checkpoint
+RESUME = True           # continue an interrupted run over unchanged inputs; False always starts over
+
+OUTPUT_COLUMNS = [
+    "qas", "table",
+    "Top 1 Topic", "Top 1 Score",
+    "Top 2 Topic", "Top 2 Score",
+    "Top 3 Topic", "Top 3 Score",
+    "Entities"
+]
 
 # Labels for classification
 LABELS = [
@@ -30,106 +46,109 @@ LABELS = [
     "Political", "Society", "Science and Technology", "Environmental", "Healthcare and Medicine"
 ]
 
-# Create output folder if it doesn't exist
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-# Initialize zero-shot classifier
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-
 # -----------------------------
 # Helper Functions
 # -----------------------------
 
-def extract_entities(text: str):
-    doc = nlp(text)
-    # unique entities with length > 2
-    return list({ent.text for ent in doc.ents if len(ent.text) > 2})
-
-def predict_topics_with_zero_shot(text: str, labels):
-    result = classifier(text, labels, multi_label=True)
-    sorted_results = sorted(zip(result['labels'], result['scores']), key=lambda x: x[1], reverse=True)
-    # return top 3 predictions
-    return sorted_results[:3]
+def extract_entities(texts):
+    # unique entities with length > 2, one list per text (batched through nlp.pipe)
+    return extract_entities_batch(texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS,
+                                  nlp=model_registry.ner(SPACY_MODEL))
+
+def zero_shot_classifier():
+    # BART pipeline or its bi-encoder approximation, per ZERO_SHOT_BACKEND (cached under separate model keys)
+    if ZERO_SHOT_BACKEND == 'bi-encoder':
+        return model_registry.bi_encoder_zero_shot(BI_ENCODER_MODEL, cache_path=CLASSIFICATION_CACHE,
+                                                   calibration_path=BI_ENCODER_CALIBRATION)
+    if ZERO_SHOT_BACKEND == 'bart':
+        return model_registry.zero_shot(ZERO_SHOT_MODEL, batch_size=BATCH_SIZE, cache_path=CLASSIFICATION_CACHE)
+    raise ValueError(f"Unknown ZERO_SHOT_BACKEND {ZERO_SHOT_BACKEND!r} (expected 'bart' or 'bi-encoder')")
+
+def predict_topics_with_zero_shot(texts, labels):
+    # top 3 predictions for every text, all texts classified in batches
+    classifier = zero_shot_classifier()
+    return classifier.classify(texts, labels, multi_label=True, top_k=3)
 
 # -----------------------------
 # Main Processing
 # -----------------------------
 
-all_rows = []
-
-for filename in os.listdir(INPUT_FOLDER):
-    if not filename.endswith(".csv"):
-        continue
-
-    input_path = os.path.join(INPUT_FOLDER, filename)
-
-    try:
-        df_input = pd.read_csv(input_path, on_bad_lines='warn', quoting=csv.QUOTE_MINIMAL)
-    except Exception as e:
-        print(f"❌ Error reading {filename}: {e}")
-        continue
-
-    if 'qas' not in df_input.columns:
-        print(f"⚠️ Skipping {filename} — no 'qas' column found.")
-        continue
-
-    # Ensure 'table' exists for consistency
-    if 'table' not in df_input.columns:
-        df_input['table'] = pd.NA
-
-    iterator = df_input.dropna(subset=['qas']).iterrows()
-    for _, row in tqdm(iterator, desc=f"Processing {filename}", unit="row"):
-        qas_text = str(row['qas']).strip()
-        table_text = str(row['table']).strip() if pd.notna(row['table']) else ""
-
-        # Use qas_text directly (no need to merge with answer)
-        combined_text = qas_text
-
-        # Extract entities and predict topics
-        entities = extract_entities(combined_text)
-        predictions = predict_topics_with_zero_shot(combined_text, LABELS)
-
-        # Ensure 3 predictions
-        while len(predictions) < 3:
-            predictions.append(("N/A", 0.0))
-
-        top1_topic, top1_score = predictions[0][0], round(float(predictions[0][1]), 4)
-        top2_topic, top2_score = predictions[1][0], round(float(predictions[1][1]), 4)
-        top3_topic, top3_score = predictions[2][0], round(float(predictions[2][1]), 4)
-
-        all_rows.append({
-            "qas": qas_text,
-            "table": table_text,
-            "Top 1 Topic": top1_topic,
-            "Top 1 Score": top1_score,
-            "Top 2 Topic": top2_topic,
-            "Top 2 Score": top2_score,
-            "Top 3 Topic": top3_topic,
-            "Top 3 Score": top3_score,
-            "Entities": ", ".join(entities)
-        })
-
-        time.sleep(0.1)  # polite delay
-
-# -----------------------------
-# Save consolidated output
-# -----------------------------
-df_output = pd.DataFrame(all_rows)
-
-desired_columns = [
-    "qas", "table",
-    "Top 1 Topic", "Top 1 Score",
-    "Top 2 Topic", "Top 2 Score",
-    "Top 3 Topic", "Top 3 Score",
-    "Entities"
-]
-for col in desired_columns:
-    if col not in df_output.columns:
-        df_output[col] = ""
-df_output = df_output[desired_columns]
-
-df_output.to_csv(OUTPUT_FILE, index=False)
-print(f"\n✅ Saved: {OUTPUT_FILE}")
+def input_files():
+    """Input CSVs, without the consolidated output (it lives in the same folder)."""
+    if not os.path.isdir(INPUT_FOLDER):
+        return []
+    return sorted(f for f in os.listdir(INPUT_FOLDER)
+                  if f.endswith(".csv") and os.path.join(INPUT_FOLDER, f) != OUTPUT_FILE)
+
+def main():
+    filenames = input_files()
+    if not filenames:
+        print(f"ℹ️ No input CSVs in {INPUT_FOLDER} — nothing to do.")
+        model_registry.log_timings(TIMING_LOG, "qadomain", files=0, rows=0)
+        return
+
+    # Rows are appended to OUTPUT_FILE every CHECKPOINT_EVERY rows; rerunning an interrupted run
+    # over the same inputs picks up where the last checkpoint left off (rows matched by content
+    # hash of file, qas and table), a completed run or changed inputs start over
+    input_id = input_fingerprint(os.path.join(INPUT_FOLDER, f) for f in filenames)
+    with CheckpointWriter(OUTPUT_FILE, OUTPUT_COLUMNS, flush_every=CHECKPOINT_EVERY, resume=RESUME,
+                          input_id=input_id) as writer:
+        for filename in filenames:
+            input_path = os.path.join(INPUT_FOLDER, filename)
+
+            try:
+                df_input = pd.read_csv(input_path, on_bad_lines='warn', quoting=csv.QUOTE_MINIMAL)
+            except Exception as e:
+                print(f"❌ Error reading {filename}: {e}")
+                continue
+
+            if 'qas' not in df_input.columns:
+                print(f"⚠️ Skipping {filename} — no 'qas' column found.")
+                continue
+
+            # Ensure 'table' exists for consistency
+            if 'table' not in df_input.columns:
+                df_input['table'] = pd.NA
+
+            df_input = df_input.dropna(subset=['qas'])
+            qas_texts = [str(q).strip() for q in df_input['qas']]
+            table_texts = [str(t).strip() if pd.notna(t) else "" for t in df_input['table']]
+
+            keys = row_keys((filename, q, t) for q, t in zip(qas_texts, table_texts))
+            todo = [i for i, key in enumerate(keys) if key not in writer]
+            if len(todo) < len(keys):
+                print(f"↩️ {filename}: {len(keys) - len(todo)} rows already classified, {len(todo)} to go")
+
+            # Use qas_text directly (no need to merge with answer); batched per checkpoint
+            with tqdm(total=len(todo), desc=f"Processing {filename}", unit="row") as bar:
+                for start in range(0, len(todo), CHECKPOINT_EVERY):
+                    idx = todo[start:start + CHECKPOINT_EVERY]
+                    texts = [qas_texts[i] for i in idx]
+                    all_predictions = predict_topics_with_zero_shot(texts, LABELS)
+                    all_entities = extract_entities(texts)
+
+                    for i, predictions, entities in zip(idx, all_predictions, all_entities):
+                        # predictions already padded to 3
+                        writer.write(keys[i], {
+                            "qas": qas_texts[i],
+                            "table": table_texts[i],
+                            "Top 1 Topic": predictions[0][0],
+                            "Top 1 Score": round(float(predictions[0][1]), 4),
+                            "Top 2 Topic": predictions[1][0],
+                            "Top 2 Score": round(float(predictions[1][1]), 4),
+                            "Top 3 Topic": predictions[2][0],
+                            "Top 3 Score": round(float(predictions[2][1]), 4),
+                            "Entities": ", ".join(entities)
+                        })
+                    bar.update(len(idx))
+
+    print(f"\n✅ Saved: {OUTPUT_FILE} ({writer.written} new rows, {len(writer.done)} total)")
+    if CLASSIFICATION_CACHE:
+        zero_shot_classifier().cache.report()
+    model_registry.log_timings(TIMING_LOG, "qadomain", files=len(filenames), rows=writer.written)
+
+if __name__ == "__main__":
+    main()
 
 # -----------------------------
 # Notes:
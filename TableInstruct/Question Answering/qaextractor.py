@@ -9,12 +9,17 @@
 # - Supports FETAQA, HybridQA, and standard QA formats (HiTab, WikiSQL, WikiTQ).
 # - Removes all double quotation marks from questions and answers.
 # - Writes CSV files using csv.QUOTE_NONE to prevent extra quoting in output.
+# - Streams records with ijson and writes rows as they are extracted, so memory stays flat
+#   regardless of input size (pass streaming=False to fall back to json.load).
+# - Each CSV is written to <name>.csv.partial and only replaces <name>.csv once complete, so
+#   a missing or malformed input never destroys the previous output.
 # ============================================================================================
 
 import os
-import json
 import csv
 
+from json_records import iter_items, AtomicOutput
+
 def extract_fetaqa(item):
     """
     Extract question and answer from FETAQA format.
@@ -51,7 +56,16 @@ def extract_hybridqa(item):
         return question, answer
     return None, None
 
-def process_files(file_configs, output_folder):
+def iter_rows(file_name, extraction_function, streaming=True):
+    """
+    Yields [question, answer] rows for every record the extraction function accepts.
+    """
+    for item in iter_items(file_name, streaming):
+        question, answer = extraction_function(item)
+        if question and answer:
+            yield [question, answer]
+
+def process_files(file_configs, output_folder, streaming=True):
     """
     Processes each JSON file with the corresponding extraction function.
     Extracted question-answer pairs are saved to CSV files with the same base filename.
@@ -59,29 +73,20 @@ def process_files(file_configs, output_folder):
     Parameters:
     - file_configs: list of tuples (file_path, extraction_function)
     - output_folder: target directory for CSV output
+    - streaming: stream records straight into the CSV writer (True) or load each file first
     """
     os.makedirs(output_folder, exist_ok=True)  # Create output directory if it doesn't exist
 
     for file_name, extraction_function in file_configs:
-        # Load JSON data from file
-        with open(file_name, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        extracted_data = []
-        for item in data:
-            question, answer = extraction_function(item)
-            if question and answer:
-                extracted_data.append([question, answer])
-
         # Define output CSV file path
         base_name = os.path.basename(file_name).replace('.json', '.csv')
         output_path = os.path.join(output_folder, base_name)
 
-        # Write to CSV using no quotes and custom escape character
-        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
+        # Write to CSV using no quotes and custom escape character (replaces output_path on success)
+        with AtomicOutput(output_path) as csvfile:
             writer = csv.writer(csvfile, quoting=csv.QUOTE_NONE, escapechar='\\')
             writer.writerow(["question", "answer"])  # Write header
-            writer.writerows(extracted_data)         # Write data rows
+            writer.writerows(iter_rows(file_name, extraction_function, streaming))  # Write data rows
 
         print(f"Extracted questions and answers saved to {output_path}")
 
@@ -7,15 +7,47 @@
 # - For each table group, builds a cleaned plain-text "qas" block by concatenating
 #   question and answer (punctuation removed, whitespace normalized).
 # - Computes semantic similarity (SentenceTransformer) between each table and
-#   its "qas" block — batched with progress bars.
+#   its "qas" block — batched with progress bars. Files are processed one at a time and
+#   only the tables no earlier file had are encoded, so each distinct table is encoded once
+#   and its vector reused by every later file's groups.
+# - Memory: only the table ids and their vectors (384 float32 per table) are kept across
+#   files; a file's groups, QAS blocks and table texts are dropped once its outputs are
+#   written. _neighbours.csv (NEIGHBOUR_K) needs the index over ALL tables, so it is written
+#   in a second pass that re-reads each file (the JSON is parsed and cleaned twice).
 # - Saves:
 #     1) relatedness_outputs/<file>.grouped.csv      (columns: similarity_score,num_pairs,qas,table,source)
 #     2) relatedness_outputs/_lowest100.csv          (100 lowest across ALL files; columns ordered: source,similarity_score,num_pairs,qas,table)
+#        — selected on the fly by topk.TopK (only LOWEST_K rows are kept in memory;
+#        LOWEST_PER_SOURCE optionally caps rows per source; file is _lowest{LOWEST_K}.csv)
 #
 # Speed/robustness tweaks:
 #   - TOKENIZERS_PARALLELISM=false (avoid rare hangs)
 #   - model.max_seq_length=256 (faster; adjust as needed)
+#   - TABLE_CHUNKING="mean"/"max" (opt-in): tables longer than the token budget are split into
+#     row windows (title + header repeated, table_chunks.table_windows), all windows are
+#     encoded in one batched pass and pooled into one vector per table, so long tables are no
+#     longer truncated to their first rows. This changes the similarity scores (and so the
+#     *.grouped.csv order and _lowest100.csv); the default None encodes the whole table
+#     truncated to max_seq_length, as before.
+#   - NEIGHBOUR_K > 0 (opt-in; also writes every distinct table body to tables.csv): an IVF
+#     index (ann_index.IVFIndex) over all table embeddings is queried with every question on
+#     its own; relatedness_outputs/_neighbours.csv has one row per question with its top-K
+#     tables and the rank of its own table (0 = not in the top K), which surfaces
+#     mislabeled / ambiguous questions. A whole QAS block mixes many questions (and answers)
+#     and would blur them into one query. Table ids resolve through tables.csv.
+#   - EXPORT_EMBEDDINGS = 'int8' | 'float16': per-dataset table and QAS embeddings are saved
+#     as memory-mapped .npy shards (embedding_store) under <output_dir>/embeddings/, so
+#     similarities can be recomputed without the model (python embedding_store.py DIR).
 #   - Auto-select CUDA if available
+#   - BACKEND = 'onnx' | 'onnx-int8': the encoder is exported once to ONNX (int8 via dynamic
+#     quantization) and run with onnxruntime on CPU (onnx_backend.OnnxEncoder);
+#     check_onnx_backend.py checks its similarities against the PyTorch path.
+#   - CPU_WORKERS > 0 on CPU-only hosts: texts are encoded by cpu_pool.CpuEncodePool
+#     (N processes, one model copy each, cores // N torch threads per process).
+#   - EMBEDDING_CACHE_DIR (opt-in): embedding_engine.EmbeddingEngine is backed by an on-disk
+#     embedding_cache.EmbeddingCache, so reruns (and tables shared across splits) reuse the
+#     cached vectors and only new texts are encoded. Off by default so scores stay exactly
+#     those of a plain encode; CACHE_DTYPE='float16' rounds every score read back from it.
 #
 # Requirements:
 #   pip install sentence-transformers pandas tqdm
@@ -27,45 +59,46 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"  # avoid rare tokenizer hangs
 import json
 import re
 import string
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 import csv
+import sys
 import torch
 from sentence_transformers import SentenceTransformer
 
+# Shared utilities live one level up (TableInstruct/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from seg_cleaner import clean_input_seg  # table segment cleaner (prompts/tokens removed, spaces collapsed)
+
+from table_store import TableStore, table_id  # cleaned tables keyed by a 128-bit content hash
+from embedding_engine import EmbeddingEngine
+from embedding_cache import EmbeddingCache
+from topk import TopK  # bounded heap: K lowest rows across all files
+from table_chunks import table_windows, pool_windows, token_counter  # row windows for long tables
+from ann_index import IVFIndex  # approximate top-k tables per QAS block
+from embedding_store import write_embeddings  # int8 / float16 .npy shards
+from cpu_pool import CpuEncodePool  # multi-process encoding on CPU-only hosts
+from onnx_backend import load_onnx_encoder  # exported (optionally int8) graph on onnxruntime
+
 # --------------------------- Paths & Model -----------------------------------
 input_dir = '.'
 output_dir = 'v2-relatedness_outputs'
 os.makedirs(output_dir, exist_ok=True)
 
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
-model.max_seq_length = 256  # speed up (default 512). Lower (e.g., 192) for more speed.
+MODEL_NAME = 'all-MiniLM-L6-v2'
+BACKEND = 'torch'          # 'torch' | 'onnx' | 'onnx-int8'
+EMBEDDING_CACHE_DIR = None  # e.g. '.embedding_cache' → reuse vectors across runs (opt-in)
+CACHE_DTYPE = 'float32'     # exact vectors, same scores as uncached; 'float16' halves the disk but rounds them
+LOWEST_K = 100             # rows in the global lowest-similarity report
+LOWEST_PER_SOURCE = None   # e.g. 20 → at most 20 rows from any one source file
+TABLE_CHUNKING = None      # None (truncate, unchanged scores) | 'mean' | 'max' pooling over row windows
+NEIGHBOUR_K = 0            # >0: top-K nearest tables per question in _neighbours.csv (+ tables.csv)
+NEIGHBOUR_N_PROBE = 8      # IVF lists scanned per query (higher = better recall, slower)
+EXPORT_EMBEDDINGS = None   # 'int8' (per-vector scale) | 'float16' → <output_dir>/embeddings/, None = off
+CPU_WORKERS = 0            # >0: encode with this many processes when no GPU (see bench_cpu_pool.py)
 
 # --------------------------- Cleaning Helpers --------------------------------
-def clean_input_seg(text: str) -> str:
-    """Clean table segment text (remove prompts/tokens, collapse spaces)."""
-    if not isinstance(text, str):
-        return ""
-    patterns = [
-        r"\[TLE\]\s*The Wikipedia page title of this table is",
-        r"The Wikipedia section title of this table is",
-        r"\[TLE\]\s*The table caption is",
-        r"\[TAB\]",
-        r"\[TAB\]\s*col:",
-        r"\bcol:\b",
-        r"\|",
-        r"\\",             # backslashes
-        r"\[SEP\]",
-        r"[TAB]\s*col:",
-        r"col:",
-    ]
-    for pattern in patterns:
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-    text = text.replace('"', '')
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
 def clean_line(text: str) -> str:
     """Basic whitespace cleanup."""
     if not isinstance(text, str):
@@ -121,113 +154,227 @@ def extract_answer(entry: dict) -> str:
         return clean_line(json.dumps(out, ensure_ascii=False))
     return clean_line(str(out))
 
-# --------------------------- Main --------------------------------------------
-all_rows = []  # accumulate rows from ALL files (for global _lowest100.csv)
-
-json_files = [fn for fn in os.listdir(input_dir) if fn.endswith('.json')]
-if not json_files:
-    print("⚠️ No .json files found in the current directory.")
-else:
-    for filename in json_files:
-        input_path = os.path.join(input_dir, filename)
-        base = os.path.splitext(filename)[0]  # NAME without extension (used as 'source')
-        output_all = os.path.join(output_dir, f"{base}.grouped.csv")
-
-        print(f"🔍 Processing {filename}...")
-
-        # Load JSON
-        try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            print(f"⚠️ Skipping {filename}: invalid JSON format")
+# --------------------------- Grouping ----------------------------------------
+def read_groups(input_path: str, filename: str, questions: list | None = None):
+    """
+    Groups one JSON file's Q/A pairs by cleaned table. Returns (groups, tables):
+      groups: table id -> list of cleaned "qa piece" strings (punctuation removed)
+      tables: table id -> (clean_seg, raw_seg) of the table's first entry
+    or None when the file is skipped. With a questions list, (table id, cleaned question)
+    is appended for every pair.
+    """
+    # Load JSON
+    try:
+        with open(input_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        print(f"⚠️ Skipping {filename}: invalid JSON format")
+        return None
+    if not isinstance(data, list):
+        print(f"⚠️ Skipping {filename}: expected a list of entries")
+        return None
+
+    groups, tables = {}, {}
+    for entry in tqdm(data, desc=f"→ reading {filename}", leave=False):
+        raw_seg = entry.get("input_seg", "")
+        clean_seg = clean_input_seg(raw_seg)
+        if not clean_seg:
             continue
-        if not isinstance(data, list):
-            print(f"⚠️ Skipping {filename}: expected a list of entries")
+
+        q = extract_question(entry, filename)
+        if not q:
             continue
+        a = extract_answer(entry)
 
-        # 1) Aggregate Q/A pairs by CLEANED table
-        groups = {}  # key: clean_seg, value: list of cleaned "qa piece" strings (punctuation removed)
-        for entry in tqdm(data, desc=f"→ reading {filename}", leave=False):
-            raw_seg = entry.get("input_seg", "")
-            clean_seg = clean_input_seg(raw_seg)
-            if not clean_seg:
-                continue
+        # Build a per-pair cleaned "qa piece": (Q + A), punctuation removed, whitespace normalized
+        q_disp = clean_line(q)
+        a_disp = clean_line(a)
+        qa_piece = clean_line(remove_punctuation(f"{q_disp} {a_disp}"))
+
+        tid = table_id(clean_seg)
+        if tid not in tables:
+            tables[tid] = (clean_seg, raw_seg)
+        groups.setdefault(tid, []).append(qa_piece)
+        if questions is not None:
+            questions.append((tid, clean_line(remove_punctuation(q_disp))))
+    return groups, tables
+
+# --------------------------- Nearest Tables ----------------------------------
+def write_neighbours(engine, table_emb, table_row, done_files):
+    """
+    _neighbours.csv: an IVF index over ALL table vectors, queried with every question.
+    Runs after every file is encoded, so each file is re-read for its questions.
+    """
+    ann = IVFIndex(table_emb, n_probe=NEIGHBOUR_N_PROBE)
+    print(f"🧭 IVF index: {ann.n_lists} lists over {len(ann)} tables (n_probe={NEIGHBOUR_N_PROBE})")
+    table_ids = list(table_row)  # row -> table id
+    neighbours_path = os.path.join(output_dir, "_neighbours.csv")
+    with open(neighbours_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+        writer.writerow(["source", "table_id", "question", "own_rank", "similarity_score",
+                         "neighbour_ids", "neighbour_scores"])
+        for filename, base in done_files:
+            questions = []  # (table id, cleaned question), one per Q/A pair
+            read_groups(os.path.join(input_dir, filename), filename, questions)
+            rows_idx = [table_row[tid] for tid, _ in questions]
+            q_emb = engine.encode([q for _, q in questions], desc="encoding questions")
+            sims = engine.row_similarity(table_emb[rows_idx], q_emb).tolist()
 
-            q = extract_question(entry, filename)
-            if not q:
+            # Nearest tables for every question (one batched index query per file)
+            nb_scores, nb_rows = ann.search(q_emb, NEIGHBOUR_K)
+            for (tid, question), own, sim, scores, nb in zip(questions, rows_idx, sims, nb_scores, nb_rows):
+                hits = [r for r in nb.tolist() if r >= 0]
+                own_rank = hits.index(own) + 1 if own in hits else 0
+                writer.writerow([
+                    base, tid, question, own_rank, sim,
+                    " ".join(table_ids[r] for r in hits),
+                    " ".join(f"{s:.4f}" for s in scores[:len(hits)]),
+                ])
+    print(f"✅ Saved nearest tables: {neighbours_path}")
+
+# --------------------------- Main --------------------------------------------
+def process_files(engine, count_tokens, token_budget, lowest):
+    """Steps 1-6 for every *.json in input_dir; rows also go to the global lowest-K heap."""
+    json_files = [fn for fn in os.listdir(input_dir) if fn.endswith('.json')]
+    if not json_files:
+        print("⚠️ No .json files found in the current directory.")
+    else:
+        # Only table ids and their vectors are kept across files; groups and table texts are
+        # dropped once a file's outputs are written (re-read for _neighbours.csv if needed)
+        table_row = {}        # table id -> row of table_emb (first appearance across ALL files)
+        table_emb = None
+        # table id -> clean_seg streamed once to tables.csv, which resolves _neighbours.csv ids
+        store = TableStore(path=os.path.join(output_dir, "tables.csv"), keep_bodies=False) if NEIGHBOUR_K else None
+        done_files = []       # (filename, base) for files that produced groups
+        for filename in json_files:
+            input_path = os.path.join(input_dir, filename)
+            base = os.path.splitext(filename)[0]  # NAME without extension (used as 'source')
+            output_all = os.path.join(output_dir, f"{base}.grouped.csv")
+
+            print(f"🔍 Processing {filename}...")
+
+            # 1) Aggregate Q/A pairs by CLEANED table
+            parsed = read_groups(input_path, filename)
+            if parsed is None:
                 continue
-            a = extract_answer(entry)
+            groups, tables = parsed
+            if not groups:
+                print(f"⚠️ No valid groups found in {filename}")
+                continue
+            done_files.append((filename, base))
 
-            # Build a per-pair cleaned "qa piece": (Q + A), punctuation removed, whitespace normalized
-            q_disp = clean_line(q)
-            a_disp = clean_line(a)
-            qa_piece = clean_line(remove_punctuation(f"{q_disp} {a_disp}"))
+            # 2) Encode only the tables no earlier file had, so each distinct table is encoded
+            #    ONCE across all files (embeddings use no punctuation)
+            new_ids = [tid for tid in groups if tid not in table_row]
+            print(f"🧮 {len(new_ids)} new tables ({len(groups) - len(new_ids)} already encoded)")
+            if new_ids:
+                if TABLE_CHUNKING:
+                    # All windows of the new tables in ONE batched call, then pooled back per table
+                    windows = [table_windows(tables[tid][1], count_tokens, token_budget, prep=remove_punctuation)
+                               for tid in new_ids]
+                    flat = [w for ws in windows for w in ws]
+                    owners = [i for i, ws in enumerate(windows) for _ in ws]
+                    n_split = sum(len(ws) > 1 for ws in windows)
+                    print(f"🪟 {len(flat)} windows ({n_split} tables over {token_budget} tokens split), {TABLE_CHUNKING} pooling")
+                    window_emb = engine.encode(flat, desc="encoding table windows")
+                    new_emb = pool_windows(window_emb, owners, len(new_ids), mode=TABLE_CHUNKING)
+                else:
+                    new_emb = engine.encode([remove_punctuation(tables[tid][0]) for tid in new_ids], desc="encoding tables")
+                for tid in new_ids:
+                    table_row[tid] = len(table_row)
+                    if store is not None:
+                        store.intern(tables[tid][0])
+                table_emb = new_emb if table_emb is None else np.concatenate([table_emb, new_emb])
 
-            groups.setdefault(clean_seg, []).append(qa_piece)
+            # 3) Build the file's QAS blocks
+            rows_idx = []
+            qas_blocks = []
+            metas = []  # (clean_seg, qas_block, num_pairs)
 
-        if not groups:
-            print(f"⚠️ No valid groups found in {filename}")
-            continue
+            for tid, qa_pieces in groups.items():
+                clean_seg = tables[tid][0]
+                # Join all QA pieces into one cleaned block (space-separated)
+                qas_block = clean_line(" ".join(qa_pieces))  # punctuation already removed per piece
+                rows_idx.append(table_row[tid])
+                qas_blocks.append(qas_block)                  # already punctuation-free
+                metas.append((clean_seg, qas_block, len(qa_pieces)))
+
+            # 4) Batched QAS embeddings vs the shared table vectors; cosine similarity as a
+            #    row-wise dot product of the normalized embeddings
+            qas_emb = engine.encode(qas_blocks, desc="encoding qas")
+            sims = engine.row_similarity(table_emb[rows_idx], qas_emb).tolist()
+
+            # 4a) Persist the aligned table / QAS vectors of this dataset (rows keyed by table id)
+            if EXPORT_EMBEDDINGS:
+                emb_dir = os.path.join(output_dir, "embeddings")
+                write_embeddings(emb_dir, f"{base}.tables", list(groups), table_emb[rows_idx], fmt=EXPORT_EMBEDDINGS)
+                write_embeddings(emb_dir, f"{base}.qas", list(groups), qas_emb, fmt=EXPORT_EMBEDDINGS)
+
+            # 5) Collect rows (per-file & global) — WITH 'source' column
+            rows = []
+            for (clean_seg, qas_block, num_pairs), sim in zip(metas, sims):
+                row = {
+                    "similarity_score": sim,
+                    "num_pairs": num_pairs,
+                    "qas": qas_block,   # punctuation-free concatenation of Q & A pairs
+                    "table": clean_seg,
+                    "source": base      # origin from NAME.json (used in NAME.grouped.csv)
+                }
+                rows.append(row)
+                lowest.push(row)
+
+            # 6) Save per-file grouped CSV (include source; keep similarity first for sorting)
+            df = pd.DataFrame(rows).sort_values("similarity_score", ascending=False)
+            df = df[["similarity_score", "num_pairs", "qas", "table", "source"]]
+            df.to_csv(output_all, index=False, quoting=csv.QUOTE_MINIMAL)
+            print(f"✅ Saved: {output_all}")
+            del groups, tables, metas, rows
+
+        if store is not None:
+            store.close()
+        if NEIGHBOUR_K and table_row:
+            write_neighbours(engine, table_emb, table_row, done_files)
+        print(f"📈 Throughput: {engine.report()}")
+
+def main():
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if BACKEND == 'torch':
+        model = SentenceTransformer(MODEL_NAME, device=device)
+        model.max_seq_length = 256  # speed up (default 512). Lower (e.g., 192) for more speed.
+    else:
+        device = 'cpu'
+        model = load_onnx_encoder(MODEL_NAME, quantized=BACKEND == 'onnx-int8', max_seq_length=256)
+
+    cache = None
+    if EMBEDDING_CACHE_DIR:
+        # int8/ONNX vectors differ slightly from torch ones → separate cache namespace
+        cache_model = MODEL_NAME if BACKEND == 'torch' else f"{MODEL_NAME}@{BACKEND}"
+        cache = EmbeddingCache(EMBEDDING_CACHE_DIR, cache_model, model.max_seq_length, dtype=CACHE_DTYPE)
+    encoder = model
+    if BACKEND == 'torch' and device == 'cpu' and CPU_WORKERS:
+        encoder = CpuEncodePool(MODEL_NAME, n_workers=CPU_WORKERS, max_seq_length=model.max_seq_length)
+        print(f"🧵 CPU pool: {encoder.n_workers} workers × {encoder.threads_per_worker} threads")
+    engine = EmbeddingEngine(encoder, batch_size=64, cache=cache)
+    count_tokens = token_counter(model.tokenizer)
+    token_budget = model.max_seq_length - 2  # room for [CLS] / [SEP]
+
+    lowest = TopK(LOWEST_K, lowest=True, per_source=LOWEST_PER_SOURCE)  # global lowest-K across ALL files
+    try:
+        process_files(engine, count_tokens, token_budget, lowest)
+    finally:
+        if encoder is not model:
+            encoder.close()  # stop the CpuEncodePool workers even if a file fails
+
+    # --------------------------- Global Lowest K ---------------------------------
+    if len(lowest):
+        # Rows come back ascending by similarity; 'source' is the FIRST column in _lowest{K}.csv
+        df_low_global = pd.DataFrame(lowest.rows())
+        df_low_global = df_low_global[["source", "similarity_score", "num_pairs", "qas", "table"]]
+        global_path = os.path.join(output_dir, f"_lowest{LOWEST_K}.csv")
+        df_low_global.to_csv(global_path, index=False, quoting=csv.QUOTE_MINIMAL)
+        print(f"✅ Saved global lowest-{LOWEST_K}: {global_path} (from {lowest.seen} rows)")
+    else:
+        print(f"⚠️ No rows produced; global _lowest{LOWEST_K}.csv not created.")
 
-        # 2) Build texts for batched encoding
-        tables = []
-        qas_blocks = []
-        metas = []  # (clean_seg, qas_block, num_pairs)
-
-        for clean_seg, qa_pieces in groups.items():
-            # Join all QA pieces into one cleaned block (space-separated)
-            qas_block = clean_line(" ".join(qa_pieces))  # punctuation already removed per piece
-            tables.append(remove_punctuation(clean_seg))  # embeddings use no punctuation
-            qas_blocks.append(qas_block)                  # already punctuation-free
-            metas.append((clean_seg, qas_block, len(qa_pieces)))
-
-        # 3) Batched embeddings with progress bars
-        seg_emb = model.encode(
-            tables,
-            convert_to_tensor=True,
-            normalize_embeddings=True,
-            batch_size=64,
-            show_progress_bar=True
-        )
-        qas_emb = model.encode(
-            qas_blocks,
-            convert_to_tensor=True,
-            normalize_embeddings=True,
-            batch_size=64,
-            show_progress_bar=True
-        )
-
-        # Cosine similarity = dot product for normalized embeddings
-        sims = (seg_emb * qas_emb).sum(dim=1).tolist()
-
-        # 4) Collect rows (per-file & global) — WITH 'source' column
-        rows = []
-        for (clean_seg, qas_block, num_pairs), sim in zip(metas, sims):
-            row = {
-                "similarity_score": sim,
-                "num_pairs": num_pairs,
-                "qas": qas_block,   # punctuation-free concatenation of Q & A pairs
-                "table": clean_seg,
-                "source": base      # origin from NAME.json (used in NAME.grouped.csv)
-            }
-            rows.append(row)
-            all_rows.append(row)
-
-        # 5) Save per-file grouped CSV (include source; keep similarity first for sorting)
-        df = pd.DataFrame(rows).sort_values("similarity_score", ascending=False)
-        df = df[["similarity_score", "num_pairs", "qas", "table", "source"]]
-        df.to_csv(output_all, index=False, quoting=csv.QUOTE_MINIMAL)
-        print(f"✅ Saved: {output_all}")
-
-# --------------------------- Global Lowest 100 -------------------------------
-if all_rows:
-    df_all = pd.DataFrame(all_rows)
-    # Reorder columns so 'source' is the FIRST column in _lowest100.csv
-    df_all = df_all[["source", "similarity_score", "num_pairs", "qas", "table"]]
-    df_low_global = df_all.sort_values("similarity_score", ascending=True).head(100)
-    global_path = os.path.join(output_dir, "_lowest100.csv")
-    df_low_global.to_csv(global_path, index=False, quoting=csv.QUOTE_MINIMAL)
-    print(f"✅ Saved global lowest-100: {global_path}")
-else:
-    print("⚠️ No rows produced; global _lowest100.csv not created.")
+if __name__ == "__main__":
+    main()
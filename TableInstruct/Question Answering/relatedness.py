@@ -2,10 +2,16 @@
 # Script Summary:
 # This script processes JSON files containing questions and table segments.
 # It:
-#   - Cleans input segments and questions using regex.
+#   - Cleans input segments and questions using regex (relatedness_text.py).
 #   - Removes punctuation to prepare text for BERT encoding.
 #   - Uses SentenceTransformer (BERT-based) to compute semantic similarity
-#     between each question and its corresponding table segment.
+#     between each question and its corresponding table segment — batched per file
+#     through embedding_engine.EmbeddingEngine (length-sorted batches, normalized
+#     embeddings, one row-wise dot product), with a records/s throughput report.
+#   - BACKEND = 'onnx' | 'onnx-int8' runs the encoder through onnxruntime instead of PyTorch
+#     (onnx_backend.OnnxEncoder; accuracy checked by check_onnx_backend.py).
+#   - EMBEDDING_CACHE_DIR (opt-in) keeps embeddings in an on-disk cache
+#     (embedding_cache.EmbeddingCache) so reruns only encode segments/questions not seen before.
 #   - Saves similarity scores, questions, and tables into CSV files.
 # Requirements:
 #   pip install sentence-transformers pandas tqdm
@@ -13,120 +19,92 @@
 
 import os
 import json
-import re
-import string
 import pandas as pd
 from tqdm import tqdm
 import csv  # ✅ For CSV quoting control
-from sentence_transformers import SentenceTransformer, util  # ✅ Activate BERT
+
+from relatedness_text import extract_question, clean_relatedness_seg, remove_punctuation  # ✅ text cleaning
+from embedding_engine import EmbeddingEngine
+from embedding_cache import EmbeddingCache
+from onnx_backend import load_onnx_encoder
 
 # Directories for input and output
 input_dir = '.'
 output_dir = 'relatedness_outputs'
-os.makedirs(output_dir, exist_ok=True)
-
-# ✅ Load the SentenceTransformer model
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-# === Clean input segment using regex ===
-def clean_input_seg(text):
-    if not isinstance(text, str):
-        return ""
-
-    # Regex patterns to remove unwanted tokens and noise
-    patterns = [
-        r"\[TLE\] The Wikipedia page title of this table is",
-        r"The Wikipedia section title of this table is",
-        r"\[TLE\] The table caption is",
-        r"\[TAB\]",
-        r"\[TAB\] col:",
-        r"\bcol:\b",
-        r"\|",
-        r"\\",            # remove backslashes
-        r"\[SEP\]",
-        r"[TAB] col:",
-        r"col:",
-    ]
-
-    for pattern in patterns:
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-
-    text = text.replace('"', '')  # remove quotation marks
-    text = re.sub(r'\s+', ' ', text)  # collapse whitespace
-    return text.strip()
-
-# === Extract and clean question based on dataset type ===
-def extract_question(entry, filename):
-    question_text = entry.get("question", "")
-    if not isinstance(question_text, str):
-        return None
-
-    if "fetaqa" in filename.lower():
-        if "[HIGHLIGHTED_END]" in question_text:
-            question = question_text.split("[HIGHLIGHTED_END]", 1)[1]
-        else:
-            return None
-    elif "hybridqa" in filename.lower():
-        if "The question:" in question_text:
-            question = question_text.split("The question:", 1)[1]
-        else:
-            return None
-    else:
-        question = question_text
-
-    # Remove special characters and normalize whitespace
-    question = question.replace('"', '').replace('?', '')
-    question = re.sub(r'\s+', ' ', question)
-    return question.strip()
-
-# === Remove punctuation from a string ===
-def remove_punctuation(text):
-    return re.sub(rf"[{re.escape(string.punctuation)}]", "", text)
+BATCH_SIZE = 128  # texts per forward pass
+MODEL_NAME = 'all-MiniLM-L6-v2'
+BACKEND = 'torch'  # 'torch' | 'onnx' | 'onnx-int8'
+EMBEDDING_CACHE_DIR = None  # e.g. '.embedding_cache' → reuse vectors across runs (opt-in)
+CACHE_DTYPE = 'float32'     # exact vectors, same scores as uncached; 'float16' halves the disk but rounds them
 
 # === Main processing loop ===
-for filename in os.listdir(input_dir):
-    if filename.endswith('.json'):
-        input_path = os.path.join(input_dir, filename)
-        output_path = os.path.join(output_dir, f"{os.path.splitext(filename)[0]}.csv")
-
-        print(f"🔍 Processing {filename}...")
-
-        with open(input_path, 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                print(f"⚠️ Skipping {filename}: invalid JSON format")
-                continue
-
-        results = []
-
-        for entry in tqdm(data, desc=f"→ {filename}", leave=False):
-            raw_input_seg = entry.get("input_seg", "")
-            question = extract_question(entry, filename)
-
-            if not raw_input_seg or not question:
-                continue
-
-            # Clean and prep the text
-            clean_seg = clean_input_seg(raw_input_seg)
-            clean_question = question
-
-            seg_for_bert = remove_punctuation(clean_seg)
-            question_for_bert = remove_punctuation(clean_question)
-
-            # ✅ BERT processes the text directly in memory, right before writing to the CSV.
-            # ✅ Compute semantic similarity using BERT
-            embeddings = model.encode([seg_for_bert, question_for_bert], convert_to_tensor=True)
-            similarity_score = util.cos_sim(embeddings[0], embeddings[1]).item()
-
-            results.append({
-                "similarity_score": similarity_score,
-                "question": clean_question,
-                "table": clean_seg
-            })
-
-        # ✅ Save results to CSV with minimal quoting
-        df = pd.DataFrame(results)
-        # df.to_csv(output_path, index=False, quoting=csv.QUOTE_NONE, escapechar='\\')
-        df.to_csv(output_path, index=False, quoting=csv.QUOTE_MINIMAL)
-        print(f"✅ Saved: {output_path}")
+def main():
+    # ✅ Load the SentenceTransformer model (imported here: torch only loads when it runs)
+    if BACKEND == 'torch':
+        from sentence_transformers import SentenceTransformer  # ✅ Activate BERT
+        model = SentenceTransformer(MODEL_NAME)
+    else:
+        model = load_onnx_encoder(MODEL_NAME, quantized=BACKEND == 'onnx-int8')
+    cache = None
+    if EMBEDDING_CACHE_DIR:
+        cache_model = MODEL_NAME if BACKEND == 'torch' else f"{MODEL_NAME}@{BACKEND}"
+        cache = EmbeddingCache(EMBEDDING_CACHE_DIR, cache_model, model.max_seq_length, dtype=CACHE_DTYPE)
+    engine = EmbeddingEngine(model, batch_size=BATCH_SIZE, cache=cache)
+    os.makedirs(output_dir, exist_ok=True)
+
+    for filename in os.listdir(input_dir):
+        if filename.endswith('.json'):
+            input_path = os.path.join(input_dir, filename)
+            output_path = os.path.join(output_dir, f"{os.path.splitext(filename)[0]}.csv")
+
+            print(f"🔍 Processing {filename}...")
+
+            with open(input_path, 'r', encoding='utf-8') as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping {filename}: invalid JSON format")
+                    continue
+
+            results = []
+            segs_for_bert = []
+            questions_for_bert = []
+
+            for entry in tqdm(data, desc=f"→ {filename}", leave=False):
+                raw_input_seg = entry.get("input_seg", "")
+                question = extract_question(entry, filename)
+
+                if not raw_input_seg or not question:
+                    continue
+
+                # Clean and prep the text
+                clean_seg = clean_relatedness_seg(raw_input_seg)
+                clean_question = question
+
+                segs_for_bert.append(remove_punctuation(clean_seg))
+                questions_for_bert.append(remove_punctuation(clean_question))
+
+                results.append({
+                    "similarity_score": None,
+                    "question": clean_question,
+                    "table": clean_seg
+                })
+
+            # ✅ Compute semantic similarity using BERT, all pairs of the file in one batched pass
+            files_before = engine.n_records, engine.seconds
+            sims = engine.pair_similarity(segs_for_bert, questions_for_bert)
+            for row, sim in zip(results, sims.tolist()):
+                row["similarity_score"] = sim
+            n, secs = engine.n_records - files_before[0], engine.seconds - files_before[1]
+            print(f"⏱️ {filename}: {n} records in {secs:.1f}s ({n / secs if secs else 0.0:.1f} records/s)")
+
+            # ✅ Save results to CSV with minimal quoting
+            df = pd.DataFrame(results)
+            # df.to_csv(output_path, index=False, quoting=csv.QUOTE_NONE, escapechar='\\')
+            df.to_csv(output_path, index=False, quoting=csv.QUOTE_MINIMAL)
+            print(f"✅ Saved: {output_path}")
+
+    print(f"📈 Throughput: {engine.report()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# ============================================================================================
+# Module: Text cleaning used by relatedness.py (no model / embedding dependencies)
+# --------------------------------------------------------------------------------------------
+# - extract_question(entry, filename): the dataset-specific question text (FeTaQA after
+#   [HIGHLIGHTED_END], HybridQA after "The question:"), quotes and "?" removed, spaces collapsed.
+# - clean_relatedness_seg(text): the cleaned table segment (seg_cleaner, relatedness patterns).
+# - remove_punctuation(text): string.punctuation stripped before encoding.
+# extract_all.py's CleanedSink imports these directly, so it stays a pure text-extraction
+# script without the SentenceTransformer / embedding cache stack.
+# ============================================================================================
+
+import os
+import re
+import sys
+import string
+
+# Shared utilities live one level up (TableInstruct/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from seg_cleaner import clean_relatedness_seg  # ✅ Precompiled segment cleaner (relatedness patterns)
+
+__all__ = ["extract_question", "clean_relatedness_seg", "remove_punctuation"]
+
+# === Extract and clean question based on dataset type ===
+def extract_question(entry, filename):
+    question_text = entry.get("question", "")
+    if not isinstance(question_text, str):
+        return None
+
+    if "fetaqa" in filename.lower():
+        if "[HIGHLIGHTED_END]" in question_text:
+            question = question_text.split("[HIGHLIGHTED_END]", 1)[1]
+        else:
+            return None
+    elif "hybridqa" in filename.lower():
+        if "The question:" in question_text:
+            question = question_text.split("The question:", 1)[1]
+        else:
+            return None
+    else:
+        question = question_text
+
+    # Remove special characters and normalize whitespace
+    question = question.replace('"', '').replace('?', '')
+    question = re.sub(r'\s+', ' ', question)
+    return question.strip()
+
+# === Remove punctuation from a string ===
+def remove_punctuation(text):
+    return re.sub(rf"[{re.escape(string.punctuation)}]", "", text)
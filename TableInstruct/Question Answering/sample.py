@@ -1,11 +1,19 @@
 import os
-import pandas as pd
-import random
+import sys
+import csv
+import numpy as np
+
+# Shared utilities live one level up (TableInstruct/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from record_index import CsvRecordIndex
 
 # Set paths
 qas_dir = "./QAS"
 demo_dir = "./Test"
 
+SAMPLE_SIZE = 50
+RANDOM_STATE = 42
+
 # Ensure output directory exists
 os.makedirs(demo_dir, exist_ok=True)
 
@@ -14,23 +22,27 @@ csv_files = [f for f in os.listdir(qas_dir) if f.endswith(".csv")]
 
 for filename in csv_files:
     file_path = os.path.join(qas_dir, filename)
-    
-    # Read CSV (with header)
-    df = pd.read_csv(file_path)
-    
-    # Skip if file has fewer than 50 rows
-    if len(df) < 50:
-        print(f"Skipping {filename}: less than 50 rows.")
-        continue
-
-    # Sample 50 rows randomly
-    sampled_df = df.sample(n=50, random_state=42)
+
+    # Index row offsets (cached in a .idx sidecar); only sampled rows get parsed.
+    # QAS files are written with QUOTE_NONE + backslash escapes by qaextractor.py.
+    with CsvRecordIndex(file_path, quoting=csv.QUOTE_NONE, escapechar="\\") as rows:
+        # Skip if file has fewer than 50 rows
+        if len(rows) < SAMPLE_SIZE:
+            print(f"Skipping {filename}: less than {SAMPLE_SIZE} rows.")
+            continue
+
+        # Same row choice and order as df.sample(n=50, random_state=42)
+        picks = np.random.RandomState(RANDOM_STATE).permutation(len(rows))[:SAMPLE_SIZE]
+        header, sampled = rows.header, rows.take(picks.tolist())
 
     # Construct output path
     output_filename = filename.replace(".csv", "-50.csv")
     output_path = os.path.join(demo_dir, output_filename)
 
     # Write to output CSV (including header)
-    sampled_df.to_csv(output_path, index=False)
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(sampled)
 
-    print(f"Sampled 50 rows from {filename} -> {output_filename}")
+    print(f"Sampled {SAMPLE_SIZE} rows from {filename} -> {output_filename}")
@@ -0,0 +1,89 @@
+# ============================================================================================
+# Module: Mergeable streaming statistics for group sizes
+# --------------------------------------------------------------------------------------------
+# StreamingStats consumes values one at a time and never stores the full list:
+#   - count / sum / mean / population variance via Welford's update, merged across
+#     partial results with Chan et al.'s pairwise formula,
+#   - quantiles (median, p90, p99, ...) from a value histogram. Group sizes are small
+#     integers with few distinct values, so the histogram is a compact *exact* sketch:
+#     quantile(q) matches linear interpolation between order statistics (numpy's default),
+#     and quantile(0.5) equals statistics.median.
+# Per-file objects merge() into an overall one without revisiting any data.
+# ============================================================================================
+
+import math
+from collections import Counter
+
+class StreamingStats:
+    def __init__(self, values=()):
+        self.n = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0            # sum of squared deviations from the mean
+        self.hist = Counter()    # value -> occurrences
+        self.update(values)
+
+    def add(self, x):
+        self.n += 1
+        self.total += x
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.hist[x] += 1
+
+    def update(self, values):
+        for x in values:
+            self.add(x)
+        return self
+
+    def merge(self, other):
+        """Folds other into self (Chan's parallel mean/variance + histogram sum)."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.total, self.mean, self.m2 = other.n, other.total, other.mean, other.m2
+            self.hist = Counter(other.hist)
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.total += other.total
+        self.hist.update(other.hist)
+        return self
+
+    # --- summaries ---
+    @property
+    def variance(self):
+        """Population variance (as statistics.pvariance)."""
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def pstdev(self):
+        return math.sqrt(self.variance)
+
+    def _value_at(self, rank, keys):
+        seen = 0
+        for v in keys:
+            seen += self.hist[v]
+            if rank < seen:
+                return v
+        return keys[-1]
+
+    def quantile(self, q):
+        """q-quantile, linear interpolation between the two nearest order statistics."""
+        if self.n == 0:
+            return 0.0
+        keys = sorted(self.hist)
+        h = (self.n - 1) * q
+        lo = math.floor(h)
+        v_lo = self._value_at(lo, keys)
+        if h == lo:
+            return float(v_lo)
+        v_hi = self._value_at(lo + 1, keys)
+        return v_lo + (h - lo) * (v_hi - v_lo)
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
@@ -0,0 +1,81 @@
+# ============================================================================================
+# Module: Token-aware row windows for long tables
+# --------------------------------------------------------------------------------------------
+# With max_seq_length=256 a SentenceTransformer only sees the first rows of most HiTab/FeTaQA
+# tables. table_windows(raw_seg, ...) splits a linearized table (table_parser) into row
+# windows that each fit the tokenizer budget:
+#   - every window repeats the title preamble and the header row, then packs as many
+#     consecutive data rows as fit;
+#   - a table that already fits is returned as ONE window equal to its usual cleaned text,
+#     so short tables embed the same text as before;
+#   - windows are cleaned like whole segments (seg_cleaner.clean_input_seg, then prep).
+# pool_windows(emb, owners, n, mode) folds the normalized window embeddings back into one
+# L2-normalized vector per table ("mean" or "max" per dimension).
+#
+# All windows of all tables are meant to go through ONE batched encode call: windows are
+# all close to the token budget, so length-sorted batches carry little padding.
+# ============================================================================================
+
+import numpy as np
+
+from table_parser import parse_table
+from seg_cleaner import clean_input_seg
+
+POOLING_MODES = ("mean", "max")
+
+def token_counter(tokenizer):
+    """count_tokens(texts) -> [n_tokens] for a Hugging Face tokenizer (no special tokens)."""
+    def count_tokens(texts):
+        if not texts:
+            return []
+        return [len(ids) for ids in tokenizer(list(texts), add_special_tokens=False)["input_ids"]]
+    return count_tokens
+
+def table_windows(raw_seg, count_tokens, budget, prep=lambda s: s):
+    """
+    Cleaned text windows of one table, each at most `budget` tokens when possible
+    (a single row longer than the budget still gets its own window and is truncated
+    by the model).
+    """
+    whole = prep(clean_input_seg(raw_seg))
+    table = parse_table(raw_seg)
+    first_data = int(table.has_header)
+    if table.n_rows - first_data < 2:
+        return [whole]
+
+    # Preamble ("[TLE] ... [TAB]") + header row are repeated at the top of every window
+    text = table.text
+    preamble = text[:text.find("[TAB]") + 5]
+    if table.has_header:
+        preamble += " " + table.row_text(0)
+    rows = [table.row_text(r) for r in range(first_data, table.n_rows)]
+
+    pieces = [prep(clean_input_seg(p)) for p in [preamble] + rows]
+    counts = count_tokens(pieces)
+    head_tokens, row_tokens = counts[0], counts[1:]
+    if head_tokens + sum(row_tokens) <= budget:
+        return [whole]
+
+    windows, current, used = [], [], head_tokens
+    for row, n in zip(rows, row_tokens):
+        if current and used + n > budget:
+            windows.append(current)
+            current, used = [], head_tokens
+        current.append(row)
+        used += n
+    windows.append(current)
+    return [prep(clean_input_seg(preamble + " [SEP] " + " [SEP] ".join(w))) for w in windows]
+
+def pool_windows(emb, owners, n_tables, mode="mean"):
+    """One L2-normalized vector per table from its windows' embeddings (rows of emb)."""
+    if mode not in POOLING_MODES:
+        raise ValueError(f"pooling mode must be one of {POOLING_MODES}, got {mode!r}")
+    owners = np.asarray(owners, dtype=np.int64)
+    if mode == "mean":
+        out = np.zeros((n_tables, emb.shape[1]), dtype=np.float32)
+        np.add.at(out, owners, emb)
+    else:
+        out = np.full((n_tables, emb.shape[1]), -np.inf, dtype=np.float32)
+        np.maximum.at(out, owners, emb)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-12)
@@ -0,0 +1,64 @@
+# ============================================================================================
+# Module: Content-addressed table store
+# --------------------------------------------------------------------------------------------
+# Interns each distinct table text once under a 128-bit content hash (blake2b, 32 hex chars)
+# so that groupings can key on the short id instead of the multi-KB table string.
+#
+# - keep_bodies=True:  one copy of each distinct body is kept for get(id).
+# - path=...:          each body is appended to a "table_id,table" CSV the first time it is
+#                      seen, so every table is written exactly once across all inputs.
+#                      With keep_bodies=False only the ids stay in memory.
+# ============================================================================================
+
+import csv
+import hashlib
+
+STORE_HEADER = ["table_id", "table"]
+
+def table_id(text: str) -> str:
+    """128-bit content hash of a table text (hex)."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+class TableStore:
+    def __init__(self, path=None, keep_bodies=True):
+        self.path = path
+        self.keep_bodies = keep_bodies
+        self._bodies = {}   # id -> body (keep_bodies) / None
+        self._file = None
+        self._writer = None
+        if path:
+            self._file = open(path, "w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+            self._writer.writerow(STORE_HEADER)
+
+    def intern(self, text: str) -> str:
+        """Returns the id of text, storing/writing the body on first sight."""
+        tid = table_id(text)
+        if tid not in self._bodies:
+            self._bodies[tid] = text if self.keep_bodies else None
+            if self._writer is not None:
+                self._writer.writerow([tid, text])
+        return tid
+
+    def get(self, tid: str) -> str:
+        body = self._bodies[tid]
+        if body is None:
+            raise KeyError(f"table body for {tid} was not kept (keep_bodies=False)")
+        return body
+
+    def __contains__(self, tid):
+        return tid in self._bodies
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._writer = None
+
+def read_store(path):
+    """Loads a table store CSV back into {table_id: table}."""
+    csv.field_size_limit(1 << 30)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return {row["table_id"]: row["table"] for row in csv.DictReader(f)}
@@ -0,0 +1,61 @@
+# ============================================================================================
+# Module: Streaming bounded top-k row selector
+# --------------------------------------------------------------------------------------------
+# TopK keeps only the k lowest (or highest) scoring rows seen so far in a bounded heap, so a
+# global "lowest 100" report needs O(k) memory instead of every row of every file.
+#
+# - per_source=N caps how many rows a single source may contribute: each source keeps its own
+#   heap of its best min(N, k) rows and the final k are taken across those, which is exactly
+#   the best k rows under the cap (memory O(sources × N)).
+# - Ties are broken by arrival order (earlier rows win), i.e. a stable sort over the stream.
+# - Rows whose score is missing/NaN are ignored.
+# ============================================================================================
+
+import heapq
+import math
+from itertools import count
+
+class TopK:
+    def __init__(self, k, lowest=True, per_source=None, score_key="similarity_score", source_key="source"):
+        if k < 0 or (per_source is not None and per_source < 1):
+            raise ValueError(f"need k >= 0 and per_source >= 1, got k={k}, per_source={per_source}")
+        self.k = k
+        self.lowest = lowest
+        self.per_source = per_source
+        self.score_key = score_key
+        self.source_key = source_key
+        self._sign = -1 if lowest else 1
+        self._seq = count()
+        self._heaps = {}   # source (or None) -> min-heap whose top is the worst kept row
+        self.seen = 0
+
+    def push(self, row):
+        """Offers one row (a dict with score_key, and source_key when per_source is set)."""
+        score = row.get(self.score_key)
+        if score is None or (isinstance(score, float) and math.isnan(score)):
+            return
+        self.seen += 1
+        cap = self.k if self.per_source is None else min(self.k, self.per_source)
+        if cap == 0:
+            return
+        source = row.get(self.source_key) if self.per_source is not None else None
+        heap = self._heaps.setdefault(source, [])
+        entry = (self._sign * score, -next(self._seq), row)
+        if len(heap) < cap:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def extend(self, rows):
+        for row in rows:
+            self.push(row)
+        return self
+
+    def __len__(self):
+        return min(self.k, sum(len(h) for h in self._heaps.values()))
+
+    def rows(self):
+        """The selected rows, best first (ascending score if lowest, else descending)."""
+        entries = [e for heap in self._heaps.values() for e in heap]
+        best = heapq.nlargest(self.k, entries, key=lambda e: e[:2])
+        return [row for _, _, row in best]
@@ -9,12 +9,15 @@
 # - Table content is kept RAW from [TAB] onward (no cleaning). No comma stripping anywhere.
 # - CSV uses QUOTE_MINIMAL with lineterminator="\n" for VS Code/Rainbow CSV friendliness.
 # - Outputs go to ./TQAS with matching base filenames (.csv).
+# - Records are streamed with ijson and written row by row (STREAMING=False → json.load).
+# - Each CSV is written to <name>.csv.partial and only replaces <name>.csv once complete.
 # ============================================================================================
 
 import os
 import re
 import csv
-import json
+
+from json_records import iter_items, AtomicOutput
 
 INPUT_FILES = [
     ("fetaqa_train_7325.json", "fetaqa"),
@@ -27,6 +30,7 @@ INPUT_FILES = [
 ]
 
 OUTPUT_DIR = "TQAS"
+STREAMING = True  # flat memory: decode and write one record at a time
 
 # ------------------------------- small helpers ----------------------------------
 
@@ -158,12 +162,11 @@ def build_table_with_prefix(dataset_tag: str, input_seg: str) -> str:
 
 # ---------------------------------- main ----------------------------------------
 
-def process_file(filename: str, dataset_tag: str, out_dir: str):
-    with open(filename, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    rows = []
-    for item in data:
+def iter_rows(filename: str, dataset_tag: str, streaming: bool = STREAMING):
+    """
+    Yields [question, answer, table] rows for every usable record.
+    """
+    for item in iter_items(filename, streaming):
         q, a = extract_question_answer(item, dataset_tag)
         if q is None:
             continue
@@ -171,21 +174,25 @@ def process_file(filename: str, dataset_tag: str, out_dir: str):
         input_seg = item.get("input_seg", "")
         table_col = build_table_with_prefix(dataset_tag, input_seg)
 
-        rows.append([q, a, table_col])
+        yield [q, a, table_col]
 
+def process_file(filename: str, dataset_tag: str, out_dir: str, streaming: bool = STREAMING):
     # Unified header for all datasets
     header = ["question", "answer", "table"]
 
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, os.path.basename(filename).replace(".json", ".csv"))
 
-    with open(out_path, "w", newline="", encoding="utf-8") as csvfile:
+    with AtomicOutput(out_path) as csvfile:  # replaces out_path only once every row is written
         # QUOTE_MINIMAL quotes fields only when needed (commas, quotes, newlines).
         writer = csv.writer(csvfile, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
         writer.writerow(header)
-        writer.writerows(rows)
+        n_rows = 0
+        for row in iter_rows(filename, dataset_tag, streaming):
+            writer.writerow(row)
+            n_rows += 1
 
-    print(f"Saved: {out_path} ({len(rows)} rows)")
+    print(f"Saved: {out_path} ({n_rows} rows)")
 
 if __name__ == "__main__":
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -0,0 +1,126 @@
+# ============================================================================================
+# Script: Micro-benchmark — seg_cleaner cleaners vs the old per-pattern re.sub loops
+# --------------------------------------------------------------------------------------------
+# Loads FeTaQA and HiTab table segments, checks that clean_input_seg (r2.py) and
+# clean_relatedness_seg (relatedness.py) produce exactly the text of the loops they replaced
+# (also on EDGE_CASES), and reports µs per segment and the speedup of clean_input_seg.
+#
+# Segments come from the raw JSON (input_seg) via record_index when the dataset files are
+# present; otherwise they are rebuilt from ./TQAS (same table text, preamble re-attached).
+# Run from TableInstruct/:  python bench_seg_cleaner.py
+# ============================================================================================
+
+import os
+import re
+import csv
+import time
+
+from record_index import JsonArrayIndex
+from seg_cleaner import clean_input_seg, clean_relatedness_seg, R2_SEG_PATTERNS, RELATEDNESS_SEG_PATTERNS
+
+QA_DIR = "Question Answering"
+DATASETS = ["fetaqa_test", "hitab_test"]
+MAX_SEGMENTS = 2000
+REPEATS = 5
+
+# ------------------------------ reference cleaner -------------------------------
+
+# Inputs where a one-pass rewrite of the loop would differ (cascades, the [TAB] character class)
+EDGE_CASES = [
+    "Beta [TAB] col: a | b |",
+    "Data\tcol: z",
+    "[TLE]The Wikipedia page title of this table is X. [TAB] col: | a |",
+    "[TA[SEP]B] co|l: x",
+    'x "col:" y [tab]  COL: z',
+]
+
+def legacy_clean(text, patterns):
+    """The per-pattern loop r2.py / relatedness.py used before seg_cleaner."""
+    if not isinstance(text, str):
+        return ""
+    for pattern in patterns:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+    text = text.replace('"', '')
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+def legacy_clean_input_seg(text):
+    return legacy_clean(text, R2_SEG_PATTERNS)
+
+def legacy_clean_relatedness_seg(text):
+    return legacy_clean(text, RELATEDNESS_SEG_PATTERNS)
+
+def count_diffs(segs):
+    return (sum(legacy_clean_input_seg(s) != clean_input_seg(s) for s in segs)
+            + sum(legacy_clean_relatedness_seg(s) != clean_relatedness_seg(s) for s in segs))
+
+# ------------------------------ segment loading ---------------------------------
+
+_FETAQA_PREFIX = re.compile(r"^\[Wikipedia page title:(.*?); (?:Wikipedia section title:(.*?); )?\] ")
+_HITAB_PREFIX = re.compile(r"^\[Table caption:(.*?); \] ")
+
+def _segments_from_json(path):
+    with JsonArrayIndex(path) as items:
+        n = min(len(items), MAX_SEGMENTS)
+        return [items[i].get("input_seg", "") for i in range(n)]
+
+def _segments_from_tqas(path):
+    """Rebuild input_seg-like text from the TQAS table column."""
+    segs = []
+    csv.field_size_limit(1 << 30)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            table = row["table"]
+            m = _FETAQA_PREFIX.match(table)
+            if m:
+                pre = f"[TLE] The Wikipedia page title of this table is {m.group(1)}. "
+                if m.group(2):
+                    pre += f"The Wikipedia section title of this table is {m.group(2)}. "
+                table = pre + table[m.end():]
+            m = _HITAB_PREFIX.match(table)
+            if m:
+                table = f"[TLE] The table caption is {m.group(1)}. " + table[m.end():]
+            segs.append(table)
+            if len(segs) >= MAX_SEGMENTS:
+                break
+    return segs
+
+def load_segments(dataset):
+    json_path = os.path.join(QA_DIR, f"{dataset}.json")
+    try:
+        return _segments_from_json(json_path), json_path
+    except (OSError, ValueError):
+        # Missing file or a Git LFS pointer instead of the dataset
+        csv_path = os.path.join(QA_DIR, "TQAS", f"{dataset}.csv")
+        return _segments_from_tqas(csv_path), csv_path
+
+# ------------------------------ benchmark ---------------------------------------
+
+def best_time(fn, segs):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        for s in segs:
+            fn(s)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    print(f"🧪 Edge cases: {count_diffs(EDGE_CASES)} diffs")
+    print(f"{'dataset':<14}{'segments':>9}{'avg chars':>11}{'legacy µs':>11}{'new µs':>9}{'speedup':>9}{'diffs':>7}")
+    for dataset in DATASETS:
+        segs, source = load_segments(dataset)
+        if not segs:
+            print(f"⚠️ No segments for {dataset} ({source})")
+            continue
+
+        diffs = count_diffs(segs)
+        t_old = best_time(legacy_clean_input_seg, segs)
+        t_new = best_time(clean_input_seg, segs)
+        avg_len = sum(len(s) for s in segs) / len(segs)
+        print(f"{dataset:<14}{len(segs):>9}{avg_len:>11.0f}"
+              f"{t_old / len(segs) * 1e6:>11.1f}{t_new / len(segs) * 1e6:>9.1f}"
+              f"{t_old / t_new:>8.2f}x{diffs:>7}")
+
+if __name__ == "__main__":
+    main()
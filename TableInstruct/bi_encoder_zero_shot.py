@@ -0,0 +1,139 @@
+# ============================================================================================
+# Module: Bi-encoder approximation of the zero-shot topic classifier
+# --------------------------------------------------------------------------------------------
+# BART-large-MNLI is a cross-encoder: premise and hypothesis go through the encoder
+# TOGETHER, so its premise states cannot be reused across the 14 LABELS hypotheses and
+# every text costs 14 full forward passes. BiEncoderZeroShot approximates it instead:
+#   - every premise is encoded ONCE and every hypothesis ("This example is {label}.", the
+#     pipeline's default template) once per run, with a small SentenceTransformer,
+#   - score(text, label) = cosine similarity of the two normalized embeddings,
+#   - an optional per-label Platt calibration  p = sigmoid(a_label * cos + b_label), fitted
+#     against the BART multi_label scores of a calibration set, maps cosines back onto the
+#     BART score scale (and fixes per-label offsets, which decide the top-1).
+#
+# classify(texts, labels, top_k=3) returns the same [(label, score)] lists as
+# zero_shot.ZeroShotClassifier.classify. eval_bi_encoder_zero_shot.py measures speedup and
+# top-1 agreement against the pipeline on sample100domain and writes a calibration file.
+# The classification scripts select it with ZERO_SHOT_BACKEND = 'bi-encoder' (through
+# model_registry.bi_encoder_zero_shot). With a ClassificationCache its scores are stored
+# under their own model key (cache_model: model + template + calibration), so they never
+# mix with the BART entries for the same texts.
+# ============================================================================================
+
+import json
+import hashlib
+import numpy as np
+
+from zero_shot import top_k_predictions
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+def fit_platt(x, y, iters=50, l2=1e-3):
+    """
+    (a, b) minimizing cross-entropy of sigmoid(a*x + b) against soft targets y in [0, 1]
+    (Newton's method with a small L2 penalty on a).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.clip(np.asarray(y, dtype=np.float64), 1e-6, 1 - 1e-6)
+    a, b = 1.0, 0.0
+    for _ in range(iters):
+        p = _sigmoid(a * x + b)
+        w = p * (1 - p)
+        g = np.array([np.dot(p - y, x) + l2 * a, np.sum(p - y)])
+        h = np.array([[np.dot(w, x * x) + l2, np.dot(w, x)],
+                      [np.dot(w, x), np.sum(w) + 1e-9]])
+        step = np.linalg.solve(h, g)
+        a, b = a - step[0], b - step[1]
+        if np.abs(step).max() < 1e-8:
+            break
+    return float(a), float(b)
+
+class BiEncoderZeroShot:
+    def __init__(self, model=DEFAULT_MODEL, batch_size=64, calibration=None,
+                 hypothesis_template=HYPOTHESIS_TEMPLATE, encoder=None, cache=None):
+        if encoder is None:
+            from sentence_transformers import SentenceTransformer
+            encoder = SentenceTransformer(model)
+        self.model = model
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.hypothesis_template = hypothesis_template
+        self.calibration = dict(calibration or {})   # label -> (a, b)
+        self.cache = cache                           # optional ClassificationCache
+
+    @property
+    def cache_model(self):
+        """Model name for the ClassificationCache; changes with the template or calibration."""
+        state = json.dumps([self.hypothesis_template, sorted((k, list(v)) for k, v in self.calibration.items())])
+        return f"bi-encoder:{self.model}:{hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()}"
+
+    def _encode(self, texts):
+        return np.asarray(self.encoder.encode(list(texts), batch_size=self.batch_size,
+                                              normalize_embeddings=True, convert_to_numpy=True),
+                          dtype=np.float32)
+
+    def similarities(self, texts, labels):
+        """(n_texts, n_labels) cosine similarities; each premise and hypothesis encoded once."""
+        premises = self._encode(texts)
+        hypotheses = self._encode(self.hypothesis_template.format(label) for label in labels)
+        return premises @ hypotheses.T
+
+    def calibrate(self, sims, labels):
+        """Applies the per-label calibration (labels without one keep the raw cosine)."""
+        out = np.array(sims, dtype=np.float64)
+        for j, label in enumerate(labels):
+            if label in self.calibration:
+                a, b = self.calibration[label]
+                out[:, j] = _sigmoid(a * out[:, j] + b)
+        return out
+
+    def fit(self, sims, target_scores, labels):
+        """Fits the per-label calibration from similarities and BART scores (same shape)."""
+        for j, label in enumerate(labels):
+            self.calibration[label] = fit_platt(sims[:, j], target_scores[:, j])
+        return self
+
+    def scores(self, texts, labels):
+        """(n_texts, n_labels) calibrated scores; cached texts are not re-encoded."""
+        texts = list(texts)
+        labels = list(labels)
+        if self.cache is None:
+            return self.calibrate(self.similarities(texts, labels), labels)
+
+        out = np.zeros((len(texts), len(labels)))
+        positions = {}
+        for i, cached in enumerate(self.cache.get_many(texts, labels, self.cache_model)):
+            if cached is None:
+                positions.setdefault(texts[i], []).append(i)
+            else:
+                out[i] = cached
+        if positions:
+            todo = list(positions)
+            fresh = self.calibrate(self.similarities(todo, labels), labels)
+            for text, row in zip(todo, fresh):
+                out[positions[text]] = row
+            self.cache.put_many(todo, labels, self.cache_model, fresh.tolist())
+        return out
+
+    def classify(self, texts, labels, multi_label=True, top_k=3, desc=None):
+        """Top-k (label, score) per text, in input order (multi_label scores, as the pipeline)."""
+        labels = list(labels)
+        return [top_k_predictions({"labels": labels, "scores": row.tolist()}, top_k)
+                for row in self.scores(texts, labels)]
+
+    # --- persistence ---
+    def save_calibration(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"hypothesis_template": self.hypothesis_template,
+                       "calibration": {k: list(v) for k, v in self.calibration.items()}}, f, indent=2)
+
+    def load_calibration(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.hypothesis_template = data.get("hypothesis_template", self.hypothesis_template)
+        self.calibration = {k: tuple(v) for k, v in data["calibration"].items()}
+        return self
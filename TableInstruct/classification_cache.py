@@ -0,0 +1,87 @@
+# ============================================================================================
+# Module: Persistent zero-shot classification result cache (SQLite)
+# --------------------------------------------------------------------------------------------
+# The same questions and table lines are re-classified by domain-bart.py, qadomain.py,
+# predict-bart.py and repeated runs over the QAS / QASd / GTQA samples, at 14 BART forward
+# passes per text. ClassificationCache stores the FULL score vector of every text:
+#   key    (text hash, label-set hash, model name, multi_label)
+#          text hash  = blake2b-128 of the exact text
+#          label hash = blake2b-128 of the ORDERED labels tuple (LABELS order matters)
+#   value  float64 scores in label-set order
+# so a rerun, a different top_k or a new output format is a lookup instead of a BART run.
+# One SQLite file (WAL mode) is shared by every script; label sets are also stored in
+# readable form in the label_sets table.
+# ============================================================================================
+
+import os
+import json
+import sqlite3
+import hashlib
+from array import array
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".classification_cache", "zero_shot.sqlite")
+KEY_BYTES = 16
+MAX_PARAMS = 900   # stays under SQLite's bound-parameter limit (999 on older builds)
+
+def text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+def label_key(labels):
+    return hashlib.blake2b(json.dumps(list(labels)).encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+class ClassificationCache:
+    def __init__(self, path=DEFAULT_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS scores (
+                                 text_key BLOB, label_key BLOB, model TEXT, multi_label INTEGER,
+                                 scores BLOB,
+                                 PRIMARY KEY (text_key, label_key, model, multi_label)) WITHOUT ROWID""")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS label_sets (label_key BLOB PRIMARY KEY, labels TEXT)")
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, texts, labels, model, multi_label=True):
+        """Cached score vectors (labels order) per text, None where missing."""
+        lk = label_key(labels)
+        keys = [text_key(t) for t in texts]
+        found = {}
+        distinct = list(dict.fromkeys(keys))
+        for start in range(0, len(distinct), MAX_PARAMS):
+            chunk = distinct[start:start + MAX_PARAMS]
+            rows = self.conn.execute(
+                f"SELECT text_key, scores FROM scores WHERE label_key = ? AND model = ? AND multi_label = ? "
+                f"AND text_key IN ({','.join('?' * len(chunk))})",
+                (lk, model, int(multi_label), *chunk))
+            for key, blob in rows:
+                found[key] = array("d", blob).tolist()
+        out = [found.get(k) for k in keys]
+        n_hit = sum(v is not None for v in out)
+        self.hits += n_hit
+        self.misses += len(out) - n_hit
+        return out
+
+    def put_many(self, texts, labels, model, score_rows, multi_label=True):
+        """Stores one score vector (labels order) per text."""
+        lk = label_key(labels)
+        self.conn.execute("INSERT OR IGNORE INTO label_sets VALUES (?, ?)", (lk, json.dumps(list(labels))))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+            [(text_key(t), lk, model, int(multi_label), array("d", s).tobytes())
+             for t, s in zip(texts, score_rows)])
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        print(f"🗃️ Classification cache {self.path}: {self.hits}/{total} hits ({rate:.0%}), {len(self)} entries")
+
+    def close(self):
+        self.conn.close()
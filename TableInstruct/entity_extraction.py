@@ -0,0 +1,65 @@
+# ============================================================================================
+# Module: Shared spaCy named-entity extraction
+# --------------------------------------------------------------------------------------------
+# qadomain.py, domain-bart.py, predict-bart.py and predict-wiki.py used to load the full
+# en_core_web_sm pipeline and call nlp(text) once per row. Here:
+#   - load_ner() reads the model's config.cfg first and loads only "ner", plus the tok2vec /
+#     transformer component "ner" listens to, if any: everything else is passed to
+#     spacy.load(exclude=...) and never built (en_core_web_sm's ner has its own embedding
+#     layer, so tagger/parser/lemmatizer/attribute_ruler and the shared tok2vec are skipped),
+#   - extract_entities_batch(texts) streams the texts through nlp.pipe(batch_size=...,
+#     n_process=...) and returns one entity list per text, in input order,
+#   - each list holds the distinct entity strings longer than 2 characters, in order of
+#     first appearance (the old code used set(), so its order was arbitrary).
+# The loaded pipeline is cached per model name, so every caller in a process shares it.
+# ============================================================================================
+
+from functools import lru_cache
+
+DEFAULT_MODEL = "en_core_web_sm"
+MIN_ENTITY_CHARS = 3
+
+def _model_config(model):
+    """config.cfg of an installed model package or a model directory."""
+    from pathlib import Path
+    from spacy import util
+    if util.is_package(model):
+        path = util.get_package_path(model)
+        meta = util.get_model_meta(path)
+        path = path / f"{meta['lang']}_{meta['name']}-{meta['version']}"
+    else:
+        path = Path(model)
+    return util.load_config(path / "config.cfg")
+
+def ner_components(config):
+    """Names of "ner" and the embedding component(s) it listens to, from a model config."""
+    components = config["components"]
+    keep = {"ner"}
+    tok2vec = components["ner"].get("model", {}).get("tok2vec", {})
+    if "Listener" in tok2vec.get("@architectures", ""):
+        upstream = tok2vec.get("upstream", "*")
+        for name in config["nlp"]["pipeline"]:
+            if name == upstream or (upstream == "*" and components[name].get("factory") in ("tok2vec", "transformer")):
+                keep.add(name)
+    return keep
+
+@lru_cache(maxsize=None)
+def load_ner(model=DEFAULT_MODEL):
+    """spaCy pipeline built with only the components named-entity recognition needs."""
+    import spacy
+    config = _model_config(model)
+    keep = ner_components(config)
+    return spacy.load(model, exclude=[name for name in config["nlp"]["pipeline"] if name not in keep])
+
+def entities_of(doc, min_chars=MIN_ENTITY_CHARS):
+    """Distinct entity texts of a Doc with at least min_chars characters, first-seen order."""
+    return list(dict.fromkeys(ent.text for ent in doc.ents if len(ent.text) >= min_chars))
+
+def extract_entities_batch(texts, batch_size=256, n_process=1, model=DEFAULT_MODEL, nlp=None):
+    """One entity list per text, in input order (nlp.pipe batching; nlp defaults to load_ner(model))."""
+    nlp = nlp or load_ner(model)
+    return [entities_of(doc) for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)]
+
+def extract_entities(text, model=DEFAULT_MODEL):
+    """Entities of a single text (prefer extract_entities_batch for many texts)."""
+    return entities_of(load_ner(model)(text))
@@ -0,0 +1,109 @@
+# ============================================================================================
+# Module: Lazily initialised model registry with a load-time log
+# --------------------------------------------------------------------------------------------
+# qadomain.py, domain-bart.py and predict-bart.py used to load spaCy and BART-large-MNLI at
+# import time (plus an "Albert Einstein" smoke test) before even looking for input files.
+# With the registry:
+#   - get(key, factory) builds a model on FIRST use and keeps it for the rest of the process,
+#     so a run that finds nothing to do never pays for a model load, and every (worker)
+#     process loads each model exactly once however many files it handles,
+#   - ner() / zero_shot() are the loaders the classification scripts share, and
+#     bi_encoder_zero_shot() the faster BART approximation they use with
+#     ZERO_SHOT_BACKEND = 'bi-encoder',
+#   - every load is timed; log_timings() prints the wall time since process start and the
+#     per-model load times, and appends them as one JSON line to a timing log.
+# ============================================================================================
+
+import json
+import os
+import time
+
+_MODELS = {}                # key -> loaded model
+_LOAD_SECONDS = {}          # key -> seconds spent in its factory
+
+def _process_age():
+    """Seconds since this process started (/proc on Linux, else 0 = registry import)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+_T0 = time.perf_counter() - _process_age()   # process start on the perf_counter clock
+
+def _name(key):
+    return key if isinstance(key, str) else ":".join(str(k) for k in key)
+
+def get(key, factory):
+    """The model registered under key, built with factory() on first use."""
+    if key not in _MODELS:
+        t = time.perf_counter()
+        print(f"⏳ Loading {_name(key)} ...")
+        _MODELS[key] = factory()
+        _LOAD_SECONDS[key] = time.perf_counter() - t
+        print(f"✅ Loaded {_name(key)} in {_LOAD_SECONDS[key]:.1f}s")
+    return _MODELS[key]
+
+def is_loaded(key):
+    return key in _MODELS
+
+def ner(model="en_core_web_sm"):
+    """NER-only spaCy pipeline (entity_extraction.load_ner)."""
+    from entity_extraction import load_ner
+    return get(("spacy", model), lambda: load_ner(model))
+
+def zero_shot(model="facebook/bart-large-mnli", batch_size=32, cache_path=None):
+    """
+    Batched zero-shot classifier (zero_shot.ZeroShotClassifier), backed by the SQLite result
+    cache at cache_path if given. Its pipeline is loaded (and timed) on the first cache miss.
+    """
+    from zero_shot import ZeroShotClassifier
+
+    def build():
+        cache = None
+        if cache_path:
+            from classification_cache import ClassificationCache
+            cache = ClassificationCache(cache_path)
+        return ZeroShotClassifier(model, batch_size=batch_size, cache=cache)
+
+    return get(("zero-shot", model, batch_size) + ((cache_path,) if cache_path else ()), build)
+
+def bi_encoder_zero_shot(model="all-MiniLM-L6-v2", batch_size=64, cache_path=None, calibration_path=None):
+    """
+    Bi-encoder approximation of zero_shot() (bi_encoder_zero_shot.BiEncoderZeroShot) with the
+    per-label calibration written by eval_bi_encoder_zero_shot.py at calibration_path (raw
+    cosines if None). Cached results go under its own model key, apart from BART's.
+    """
+    from bi_encoder_zero_shot import BiEncoderZeroShot
+
+    def build():
+        cache = None
+        if cache_path:
+            from classification_cache import ClassificationCache
+            cache = ClassificationCache(cache_path)
+        classifier = BiEncoderZeroShot(model, batch_size=batch_size, cache=cache)
+        if calibration_path:
+            classifier.load_calibration(calibration_path)
+        return classifier
+
+    return get(("bi-encoder", model, batch_size, cache_path, calibration_path), build)
+
+def timings():
+    """{'elapsed': seconds since process start, 'models': {name: load seconds}}."""
+    return {"elapsed": round(time.perf_counter() - _T0, 3),
+            "models": {_name(k): round(v, 3) for k, v in _LOAD_SECONDS.items()}}
+
+def log_timings(path, script, **extra):
+    """Prints the timings and appends them (plus extra fields) as one JSON line to path."""
+    record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "script": script, "pid": os.getpid(),
+              **timings(), **extra}
+    loads = ", ".join(f"{k} {v:.1f}s" for k, v in record["models"].items()) or "no models loaded"
+    print(f"⏱️ {script}: {record['elapsed']:.2f}s total ({loads})")
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    return record
@@ -0,0 +1,295 @@
+# ============================================================================================
+# Module: Byte-offset record index for TableInstruct JSON arrays and derived CSVs
+# --------------------------------------------------------------------------------------------
+# Builds a sidecar index next to a data file that stores the [start, end) byte offsets of
+# every record, then serves single records or random samples by slicing a memory-mapped
+# view of the file. Only the records that are asked for are ever decoded.
+#
+# - JSON: one record per element of the top-level array (e.g. fetaqa_test.json,
+#         tabfact_train_92283_part1.json). Elements are located with a single regex scan
+#         that skips whole string literals, so table text is never decoded while indexing.
+# - CSV:  one record per row (header included as record 0). Quoted fields may span lines;
+#         pass escapechar for files written with QUOTE_NONE + escapechar (e.g. ./QAS).
+#
+# Sidecar layout (<file>.idx, native byte order, machine-local):
+#   header  = magic, source size, source mtime_ns, record count, kind
+#   offsets = 2 * count unsigned 64-bit integers (start, end) per record
+# The index is rebuilt automatically whenever the source size or mtime changes.
+#
+# Usage:
+#   from record_index import JsonArrayIndex
+#   with JsonArrayIndex("fetaqa_test.json") as items:
+#       print(len(items), items[0]["question"])
+#       sample = items.sample(50, seed=42)
+# ============================================================================================
+
+import io
+import os
+import re
+import csv
+import json
+import mmap
+import random
+import struct
+from abc import ABC, abstractmethod
+from array import array
+
+INDEX_SUFFIX = ".idx"
+_MAGIC = b"TIRIDX01"
+_HEADER = struct.Struct("=8sQqQQ")  # magic, source_size, source_mtime_ns, count, kind
+KIND_JSON = 0
+KIND_CSV = 1
+
+_WS = b" \t\r\n"
+
+# Whole string literal (escape-aware, unrolled loop) | opening bracket | closing bracket | comma
+_JSON_TOKEN = re.compile(rb'("[^"\\]*(?:\\.[^"\\]*)*")|([\[{])|([\]}])|(,)', re.DOTALL)
+
+# ------------------------------- small helpers ----------------------------------
+
+def _skip_ws(buf, pos, end):
+    while pos < end and buf[pos] in _WS:
+        pos += 1
+    return pos
+
+def _rskip_ws(buf, start, pos):
+    while pos > start and buf[pos - 1] in _WS:
+        pos -= 1
+    return pos
+
+def _csv_token_regex(escapechar):
+    if escapechar:
+        esc = re.escape(escapechar.encode("utf-8"))
+        return re.compile(rb'"(?:[^"' + esc + rb']|' + esc + rb'.)*"|' + esc + rb'.|\n', re.DOTALL)
+    return re.compile(rb'"[^"]*"|\n')
+
+# ------------------------------- span scanners ----------------------------------
+
+def json_array_spans(buf):
+    """
+    Returns array('Q') of (start, end) byte offsets for each element of the top-level
+    JSON array in buf (bytes / mmap). Raises ValueError if buf is not a JSON array.
+    """
+    end = len(buf)
+    pos = _skip_ws(buf, 0, end)
+    if pos >= end or buf[pos] != ord("["):
+        raise ValueError("expected a top-level JSON array")
+
+    spans = array("Q")
+    depth = 0
+    item_start = pos + 1
+    for m in _JSON_TOKEN.finditer(buf, pos + 1):
+        kind = m.lastindex
+        if kind == 1:
+            continue
+        if kind == 2:
+            depth += 1
+            continue
+        if kind == 3 and depth > 0:
+            depth -= 1
+            continue
+        if depth > 0:
+            continue  # comma inside a nested value
+
+        # Top-level ',' or the closing ']' of the array
+        s = _skip_ws(buf, item_start, m.start())
+        e = _rskip_ws(buf, s, m.start())
+        if e > s:
+            spans.append(s)
+            spans.append(e)
+        elif kind == 4:
+            raise ValueError(f"empty array element at byte {m.start()}")
+        if kind == 3:
+            return spans
+        item_start = m.end()
+
+    raise ValueError("unterminated JSON array")
+
+def csv_record_spans(buf, escapechar=None):
+    """
+    Returns array('Q') of (start, end) byte offsets for each non-empty CSV record in buf.
+    Newlines inside quoted fields (or escaped with escapechar) do not end a record.
+    """
+    token = _csv_token_regex(escapechar)
+    spans = array("Q")
+    start = 0
+    for m in token.finditer(buf):
+        if buf[m.start()] != ord("\n"):
+            continue
+        e = m.start()
+        if e > start and buf[e - 1] == ord("\r"):
+            e -= 1
+        if e > start:
+            spans.append(start)
+            spans.append(e)
+        start = m.end()
+    e = len(buf)
+    if e > start and buf[e - 1] == ord("\r"):
+        e -= 1
+    if e > start:
+        spans.append(start)
+        spans.append(e)
+    return spans
+
+# ------------------------------- index building ---------------------------------
+
+def index_path_for(path):
+    return path + INDEX_SUFFIX
+
+def _read_header(index_path):
+    try:
+        with open(index_path, "rb") as f:
+            raw = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(raw) != _HEADER.size:
+        return None
+    header = _HEADER.unpack(raw)
+    return header if header[0] == _MAGIC else None
+
+def _is_fresh(path, index_path, kind):
+    header = _read_header(index_path)
+    if header is None:
+        return False
+    st = os.stat(path)
+    _, size, mtime_ns, count, idx_kind = header
+    return (size == st.st_size and mtime_ns == st.st_mtime_ns and idx_kind == kind
+            and os.path.getsize(index_path) == _HEADER.size + 16 * count)
+
+def build_index(path, kind=KIND_JSON, index_path=None, escapechar=None):
+    """
+    Scans path once and writes its sidecar index. Returns the index path.
+    """
+    index_path = index_path or index_path_for(path)
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        if st.st_size == 0:
+            spans = array("Q")
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if kind == KIND_JSON:
+                    spans = json_array_spans(buf)
+                else:
+                    spans = csv_record_spans(buf, escapechar)
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns, len(spans) // 2, kind))
+        spans.tofile(out)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+# ------------------------------- readers ----------------------------------------
+
+class _RecordIndex(ABC):
+    """Memory-mapped data file + offsets; subclasses decide how a record is decoded."""
+
+    kind = None
+
+    def __init__(self, path, index_path=None, rebuild=False, escapechar=None):
+        self.path = path
+        self.index_path = index_path or index_path_for(path)
+        if rebuild or not _is_fresh(path, self.index_path, self.kind):
+            build_index(path, self.kind, self.index_path, escapechar)
+
+        with open(self.index_path, "rb") as f:
+            f.seek(_HEADER.size)
+            self._offsets = array("Q")
+            self._offsets.frombytes(f.read())
+        self._count = len(self._offsets) // 2
+
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    # --- raw access ---
+    def _raw(self, n):
+        if n < 0:
+            n += self._count
+        if not 0 <= n < self._count:
+            raise IndexError(f"record {n} out of range (0..{self._count - 1})")
+        return self._buf[self._offsets[2 * n]:self._offsets[2 * n + 1]]
+
+    def raw(self, n):
+        """Raw bytes of record n (no decoding)."""
+        return self._raw(n)
+
+    @abstractmethod
+    def _decode(self, raw):
+        """Record value from its raw bytes."""
+
+    # --- sequence protocol ---
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, n):
+        return self._decode(self._raw(n))
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def take(self, indices):
+        """Decoded records at the given positions, in the given order."""
+        return [self[n] for n in indices]
+
+    def sample(self, k, seed=None):
+        """k distinct records drawn uniformly at random (random.Random(seed).sample order)."""
+        rng = random.Random(seed)
+        return self.take(rng.sample(range(len(self)), k))
+
+    # --- lifecycle ---
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class JsonArrayIndex(_RecordIndex):
+    """Random access to the elements of a top-level JSON array file."""
+
+    kind = KIND_JSON
+
+    def _decode(self, raw):
+        return json.loads(raw)
+
+class CsvRecordIndex(_RecordIndex):
+    """
+    Random access to the data rows of a CSV file. Row 0 of the file is exposed as
+    .header and excluded from len()/indexing; fmtparams are passed to csv.reader.
+    """
+
+    kind = KIND_CSV
+
+    def __init__(self, path, index_path=None, rebuild=False, **fmtparams):
+        self.fmtparams = fmtparams
+        super().__init__(path, index_path, rebuild, fmtparams.get("escapechar"))
+        self.header = self._decode(self._buf[self._offsets[0]:self._offsets[1]]) if self._count else None
+        self._count = max(self._count - 1, 0)
+
+    def _raw(self, n):
+        if n < 0:
+            n += self._count
+        if not 0 <= n < self._count:
+            raise IndexError(f"row {n} out of range (0..{self._count - 1})")
+        return self._buf[self._offsets[2 * n + 2]:self._offsets[2 * n + 3]]
+
+    def _decode(self, raw):
+        return next(csv.reader(io.StringIO(raw.decode("utf-8"), newline=""), **self.fmtparams))
+
+# ------------------------------- CLI --------------------------------------------
+
+if __name__ == "__main__":
+    import sys
+
+    # python record_index.py FILE.json [FILE.csv ...]  → (re)build sidecar indexes
+    for target in sys.argv[1:]:
+        target_kind = KIND_CSV if target.lower().endswith(".csv") else KIND_JSON
+        out = build_index(target, target_kind)
+        header = _read_header(out)
+        print(f"✅ Indexed {target}: {header[3]} records → {out}")
@@ -1,63 +1,172 @@
 import os
 import json
 import ijson
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # === Configuration ===
 input_folder = "."
 output_folder = "."
 MAX_BYTES = 20_000_000  # 20 MB limit per slice
+MAX_WORKERS = os.cpu_count() or 1  # large files sliced at the same time
+RESUME = True  # continue from the checkpoint manifest of an interrupted run
 
 # List of large files to process
 large_files = [
     "tabfact_train_92283.json",
 ]
 
-# === Helper: estimate JSON-encoded byte size of one entry ===
-def get_json_size(obj):
-    return len(json.dumps(obj, ensure_ascii=False).encode('utf-8'))
+# === Helper: serialize one entry once, laid out as json.dump(batch, indent=2) would ===
+def encode_item(obj):
+    # Strings never contain raw newlines in JSON, so re-indenting line starts is safe.
+    text = json.dumps(obj, ensure_ascii=False, indent=2)
+    return ("  " + text.replace("\n", "\n  ")).encode("utf-8")
+
+# === Helper: write one part from pre-encoded items (atomic rename) ===
+def write_part(save_path, chunks):
+    tmp_path = save_path + ".tmp"
+    with open(tmp_path, "wb") as out_f:
+        out_f.write(b"[\n")
+        for i, chunk in enumerate(chunks):
+            if i:
+                out_f.write(b",\n")
+            out_f.write(chunk)
+        out_f.write(b"\n]")
+    os.replace(tmp_path, save_path)
+
+# === Checkpoint manifest: one per input file, rewritten after every finished part ===
+# (JSON content, but not named *.json so scripts globbing the slice folder skip it)
+def manifest_path_for(base_name):
+    return os.path.join(output_folder, f"{base_name}.slices.manifest")
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def load_manifest(path, filename, source_stat):
+    """
+    Returns the manifest of a previous run if it still describes the same source and
+    MAX_BYTES, trimmed to the parts that are actually on disk; otherwise None.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    if (manifest.get("source") != filename
+            or manifest.get("source_size") != source_stat.st_size
+            or manifest.get("source_mtime_ns") != source_stat.st_mtime_ns
+            or manifest.get("max_bytes") != MAX_BYTES):
+        return None
+
+    # Keep only the prefix of parts whose files exist with the recorded size
+    valid_parts = []
+    for part in manifest.get("parts", []):
+        part_path = os.path.join(output_folder, part["file"])
+        if not os.path.exists(part_path) or os.path.getsize(part_path) != part["bytes"]:
+            break
+        valid_parts.append(part)
+
+    if len(valid_parts) != len(manifest.get("parts", [])):
+        manifest["complete"] = False
+    manifest["parts"] = valid_parts
+    manifest["items_done"] = sum(p["items"] for p in valid_parts)
+    return manifest
 
 # === Main slicing function ===
 def slice_json_stream_by_size(filename):
     input_path = os.path.join(input_folder, filename)
     base_name = os.path.splitext(filename)[0]
+    manifest_path = manifest_path_for(base_name)
+    source_stat = os.stat(input_path)
+
+    manifest = load_manifest(manifest_path, filename, source_stat) if RESUME else None
+    if manifest and manifest.get("complete"):
+        print(f"⏭️ Already sliced: {filename} ({len(manifest['parts'])} parts, see {manifest_path})")
+        return len(manifest["parts"]), manifest["items_done"]
+
+    if manifest is None:
+        manifest = {
+            "source": filename,
+            "source_size": source_stat.st_size,
+            "source_mtime_ns": source_stat.st_mtime_ns,
+            "max_bytes": MAX_BYTES,
+            "parts": [],
+            "items_done": 0,
+            "complete": False,
+        }
+
+    skip = manifest["items_done"]
+    part_num = len(manifest["parts"]) + 1
+    count = skip
+
+    if skip:
+        print(f"\n🔁 Resuming: {filename} at part {part_num} (skipping {skip} already written entries)")
+    else:
+        print(f"\n📦 Processing (size-aware slicing): {filename}")
+
+    def flush(chunks, nbytes):
+        save_name = f"{base_name}_part{part_num}.json"
+        save_path = os.path.join(output_folder, save_name)
+        write_part(save_path, chunks)
+        manifest["parts"].append({"file": save_name, "items": len(chunks), "bytes": os.path.getsize(save_path)})
+        manifest["items_done"] += len(chunks)
+        save_manifest(manifest_path, manifest)
+        print(f"  ✅ Saved: {save_path} ({len(chunks)} items, ~{nbytes/1e6:.2f} MB)")
 
-    print(f"\n📦 Processing (size-aware slicing): {filename}")
-    
     with open(input_path, "rb") as f:
         objects = ijson.items(f, "item")
+        # Entries already in finished parts are only decoded, never re-encoded or re-written
+        deque(islice(objects, skip), maxlen=0)
+
         batch = []
         batch_size = 0
-        part_num = 1
-        count = 0
 
         for obj in objects:
-            obj_size = get_json_size(obj)
+            chunk = encode_item(obj)
+            obj_size = len(chunk) + 2  # plus the ",\n" separator
             # Write batch if adding this object would exceed limit
             if batch_size + obj_size > MAX_BYTES and batch:
-                save_name = f"{base_name}_part{part_num}.json"
-                save_path = os.path.join(output_folder, save_name)
-                with open(save_path, "w", encoding="utf-8") as out_f:
-                    json.dump(batch, out_f, ensure_ascii=False, indent=2)
-                print(f"  ✅ Saved: {save_path} ({len(batch)} items, ~{batch_size/1e6:.2f} MB)")
+                flush(batch, batch_size)
                 batch = []
                 batch_size = 0
                 part_num += 1
 
-            batch.append(obj)
+            batch.append(chunk)
             batch_size += obj_size
             count += 1
 
         # Save any remaining entries
         if batch:
-            save_name = f"{base_name}_part{part_num}.json"
-            save_path = os.path.join(output_folder, save_name)
-            with open(save_path, "w", encoding="utf-8") as out_f:
-                json.dump(batch, out_f, ensure_ascii=False, indent=2)
-            print(f"  ✅ Saved: {save_path} ({len(batch)} items, ~{batch_size/1e6:.2f} MB)")
+            flush(batch, batch_size)
+        else:
+            part_num -= 1
+
+    manifest["complete"] = True
+    save_manifest(manifest_path, manifest)
 
     print(f"🎉 Done slicing '{filename}' into {part_num} parts ({count} total entries).")
+    return part_num, count
 
 # === Main runner ===
 if __name__ == "__main__":
-    for file in large_files:
-        slice_json_stream_by_size(file)
+    workers = max(1, min(MAX_WORKERS, len(large_files)))
+    if workers == 1:
+        for file in large_files:
+            slice_json_stream_by_size(file)
+    else:
+        # One worker process per file; each keeps its own manifest, so a crash in one
+        # file does not cost the progress of the others.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(slice_json_stream_by_size, file): file for file in large_files}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ Failed slicing {futures[future]}: {e}")
@@ -0,0 +1,173 @@
+# ============================================================================================
+# Module: Parser for the linearized TableInstruct table format
+# --------------------------------------------------------------------------------------------
+#   [TLE] <title / caption preamble> [TAB] col: | h1 | h2 | [SEP] | a1 | a2 | [SEP] | ...
+#
+# parse_table(text) scans the string once and returns a ParsedTable that only stores integer
+# offsets into the original string (no per-cell copies):
+#   - title_span             (start, end) of the preamble between [TLE] and [TAB]
+#   - row_spans              (start, end) of each row's raw text, rows split on [SEP]
+#   - row_offsets            row r owns cells row_offsets[r] .. row_offsets[r+1]-1
+#   - cell_starts/cell_ends  whitespace-trimmed span of every cell (text between two '|')
+# Row 0 is the header when it is introduced by "col:" (FeTaQA, WikiTQ, ...); HiTab tables
+# have no "col:" and keep their multi-row headers as ordinary rows.
+#
+# Strings are only materialized on request (cell(), row(), column(), header()), and
+# content_hash() fingerprints the cell grid independently of spacing/formatting.
+# ============================================================================================
+
+import re
+import hashlib
+from array import array
+
+_DELIM_RE = re.compile(r"\||\[SEP\]")
+_PIPE = "|"
+
+def _trim(text, s, e):
+    while s < e and text[s].isspace():
+        s += 1
+    while e > s and text[e - 1].isspace():
+        e -= 1
+    return s, e
+
+class ParsedTable:
+    """Columnar view of one linearized table; every span indexes into .text."""
+
+    __slots__ = ("text", "title_span", "has_header", "row_spans", "row_offsets",
+                 "cell_starts", "cell_ends")
+
+    def __init__(self, text):
+        self.text = text
+        self.title_span = (0, 0)
+        self.has_header = False
+        self.row_spans = array("l")
+        self.row_offsets = array("l", [0])
+        self.cell_starts = array("l")
+        self.cell_ends = array("l")
+
+    # --- shape ---
+    @property
+    def n_rows(self):
+        """Number of rows, header row included."""
+        return len(self.row_offsets) - 1
+
+    @property
+    def n_cols(self):
+        """Width of the widest row."""
+        offs = self.row_offsets
+        return max((offs[r + 1] - offs[r] for r in range(self.n_rows)), default=0)
+
+    @property
+    def n_cells(self):
+        return len(self.cell_starts)
+
+    @property
+    def shape(self):
+        """(data rows, columns) — the header row is not counted."""
+        return self.n_rows - int(self.has_header), self.n_cols
+
+    # --- lazy string access ---
+    @property
+    def title(self):
+        s, e = self.title_span
+        return self.text[s:e]
+
+    def row_text(self, r):
+        """Raw text of row r exactly as it appears in the source (pipes included)."""
+        return self.text[self.row_spans[2 * r]:self.row_spans[2 * r + 1]]
+
+    def cell(self, r, c):
+        i = self.row_offsets[r] + c
+        if not self.row_offsets[r] <= i < self.row_offsets[r + 1]:
+            raise IndexError(f"cell ({r}, {c}) out of range")
+        return self.text[self.cell_starts[i]:self.cell_ends[i]]
+
+    def row(self, r):
+        t, starts, ends = self.text, self.cell_starts, self.cell_ends
+        return [t[starts[i]:ends[i]] for i in range(self.row_offsets[r], self.row_offsets[r + 1])]
+
+    def header(self):
+        return self.row(0) if self.has_header else []
+
+    def column(self, c, include_header=False):
+        """Cells of column c (rows shorter than c+1 cells are skipped)."""
+        first = 0 if include_header or not self.has_header else 1
+        t, offs = self.text, self.row_offsets
+        out = []
+        for r in range(first, self.n_rows):
+            i = offs[r] + c
+            if i < offs[r + 1]:
+                out.append(t[self.cell_starts[i]:self.cell_ends[i]])
+        return out
+
+    # --- fingerprint ---
+    def content_hash(self, digest_size=16):
+        """128-bit (default) blake2b over the cell grid; ignores spacing around cells."""
+        h = hashlib.blake2b(digest_size=digest_size)
+        t, starts, ends, offs = self.text, self.cell_starts, self.cell_ends, self.row_offsets
+        for r in range(self.n_rows):
+            h.update("\x1f".join(t[starts[i]:ends[i]] for i in range(offs[r], offs[r + 1])).encode("utf-8"))
+            h.update(b"\x1e")
+        return h.hexdigest()
+
+def parse_table(text):
+    """
+    Parses a linearized table string (a full input_seg or a raw "[TAB] ..." substring).
+    Text without [TAB] yields a table with no rows.
+    """
+    table = ParsedTable(text if isinstance(text, str) else "")
+    text = table.text
+    tab = text.find("[TAB]")
+    if tab == -1:
+        return table
+
+    tle = text.rfind("[TLE]", 0, tab)
+    table.title_span = _trim(text, tle + 5 if tle != -1 else 0, tab)
+
+    row_spans, row_offsets = table.row_spans, table.row_offsets
+    cell_starts, cell_ends = table.cell_starts, table.cell_ends
+
+    row_start = tab + 5
+    first_pipe = -1   # first '|' of the current row
+    prev_pipe = -1    # end of the previous '|' in the current row
+
+    def close_row(end):
+        if len(cell_starts) > row_offsets[-1]:
+            row_spans.extend(_trim(text, row_start, end))
+            row_offsets.append(len(cell_starts))
+            if len(row_offsets) == 2:
+                prefix = text[row_start:first_pipe].strip().lower()
+                table.has_header = prefix == "col:"
+
+    for m in _DELIM_RE.finditer(text, row_start):
+        if text[m.start()] == _PIPE:
+            if prev_pipe == -1:
+                first_pipe = m.start()
+            else:
+                s, e = _trim(text, prev_pipe, m.start())
+                cell_starts.append(s)
+                cell_ends.append(e)
+            prev_pipe = m.end()
+        else:
+            close_row(prev_pipe if prev_pipe != -1 else m.start())
+            row_start = m.end()
+            prev_pipe = first_pipe = -1
+
+    close_row(prev_pipe if prev_pipe != -1 else len(text))
+    return table
+
+if __name__ == "__main__":
+    import sys
+    from record_index import JsonArrayIndex
+
+    # python table_parser.py FILE.json [...]  → table size summary per dataset
+    for path in sys.argv[1:]:
+        with JsonArrayIndex(path) as items:
+            rows = cols = cells = 0
+            for item in items:
+                t = parse_table(item.get("input_seg", ""))
+                rows += t.shape[0]
+                cols += t.shape[1]
+                cells += t.n_cells
+            n = max(len(items), 1)
+            print(f"{path}: {len(items)} tables, avg {rows / n:.1f} rows × {cols / n:.1f} cols, {cells / n:.0f} cells")
@@ -0,0 +1,95 @@
+# ============================================================================================
+# Module: Batched zero-shot topic classification (BART-large-MNLI pipeline)
+# --------------------------------------------------------------------------------------------
+# qadomain.py, domain-bart.py and predict-bart.py used to call
+#     classifier(text, LABELS, multi_label=True)
+# once per row: every call ran its 14 (premise, hypothesis) pairs as a separate small batch,
+# followed by a time.sleep(0.1) although no remote API is involved.
+#
+# ZeroShotClassifier.classify(texts, labels) instead:
+#   - sorts the texts by length (similar lengths → little padding) and feeds them to the
+#     pipeline as LISTS; the pipeline expands every text into one pair per label and
+#     stacks pairs from many texts into padded batches of batch_size,
+#   - restores the input order and returns the top-k (label, score) per text, padded with
+#     ("N/A", 0.0) so callers can always unpack k predictions.
+#
+# With a classification_cache.ClassificationCache, texts already scored for the same
+# (labels, model, multi_label) are answered from the cache, only the rest reach BART (each
+# distinct text once), and the pipeline itself is only loaded if something is missing.
+# ============================================================================================
+
+from tqdm import tqdm
+
+import model_registry
+
+DEFAULT_MODEL = "facebook/bart-large-mnli"
+
+def top_k_predictions(result, k=3):
+    """[(label, score)] of one pipeline result, best first, padded to k entries."""
+    ranked = sorted(zip(result["labels"], result["scores"]), key=lambda x: x[1], reverse=True)[:k]
+    while len(ranked) < k:
+        ranked.append(("N/A", 0.0))
+    return ranked
+
+def _result(text, labels, scores):
+    """A cached score vector (labels order) in the pipeline's result format."""
+    ranked = sorted(zip(labels, scores), key=lambda x: x[1], reverse=True)
+    return {"sequence": text, "labels": [l for l, _ in ranked], "scores": [s for _, s in ranked]}
+
+def _load_pipeline(model, device):
+    from transformers import pipeline
+    if device is None:
+        import torch
+        device = 0 if torch.cuda.is_available() else -1
+    return pipeline("zero-shot-classification", model=model, device=device)
+
+class ZeroShotClassifier:
+    def __init__(self, model=DEFAULT_MODEL, batch_size=32, chunk_size=256, device=None, cache=None):
+        self.model = model
+        self.device = device
+        self.batch_size = batch_size   # (premise, hypothesis) pairs per forward pass
+        self.chunk_size = chunk_size   # texts handed to the pipeline per call (progress granularity)
+        self.cache = cache             # optional ClassificationCache
+
+    @property
+    def pipeline(self):
+        """The transformers pipeline, loaded (once per process) on first use."""
+        return model_registry.get(("zero-shot-pipeline", self.model, self.device),
+                                  lambda: _load_pipeline(self.model, self.device))
+
+    def scores(self, texts, labels, multi_label=True, desc="classifying"):
+        """Raw pipeline results ({'labels', 'scores'}) for every text, in input order."""
+        texts = list(texts)
+        labels = list(labels)
+        results = [None] * len(texts)
+        if self.cache is not None:
+            for i, cached in enumerate(self.cache.get_many(texts, labels, self.model, multi_label)):
+                if cached is not None:
+                    results[i] = _result(texts[i], labels, cached)
+
+        # Each distinct uncached text goes through the pipeline once, longest first
+        positions = {}
+        for i, res in enumerate(results):
+            if res is None:
+                positions.setdefault(texts[i], []).append(i)
+        todo = sorted(positions, key=len, reverse=True)
+        with tqdm(total=len(todo), desc=desc, unit="text") as bar:
+            for start in range(0, len(todo), self.chunk_size):
+                chunk = todo[start:start + self.chunk_size]
+                out = self.pipeline(chunk, candidate_labels=labels,
+                                    multi_label=multi_label, batch_size=self.batch_size)
+                if isinstance(out, dict):   # older pipelines unwrap one-element lists
+                    out = [out]
+                for text, res in zip(chunk, out):
+                    for i in positions[text]:
+                        results[i] = res
+                if self.cache is not None:
+                    by_label = [dict(zip(res["labels"], res["scores"])) for res in out]
+                    self.cache.put_many(chunk, labels, self.model,
+                                        [[float(d[l]) for l in labels] for d in by_label], multi_label)
+                bar.update(len(chunk))
+        return results
+
+    def classify(self, texts, labels, multi_label=True, top_k=3, desc="classifying"):
+        """Top-k (label, score) per text, in input order."""
+        return [top_k_predictions(r, top_k) for r in self.scores(texts, labels, multi_label, desc)]